@@ -2,22 +2,33 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import security
 from app.core.config import settings
+from app.core.passwords import PasswordHashingOverloadedError
 from app.core.security import get_current_user
 from app.schemas.token import Token
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.crud.user import user as user_crud
-from app.db.session import get_db
+from app.db.session import get_async_db
 
 router = APIRouter()
 
+def _overloaded(error: PasswordHashingOverloadedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 @router.post("/login", response_model=Token)
-async def login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
+async def login(db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     """OAuth2 compatible token login, get an access token for future requests."""
-    user = user_crud.authenticate(db, email=form_data.username, password=form_data.password)
+    try:
+        user = await user_crud.aauthenticate(db, email=form_data.username, password=form_data.password)
+    except PasswordHashingOverloadedError as e:
+        raise _overloaded(e)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,15 +50,18 @@ async def login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestF
     }
 
 @router.post("/signup", response_model=User)
-async def create_user(*, db: Session = Depends(get_db), user_in: UserCreate) -> Any:
+async def create_user(*, db: AsyncSession = Depends(get_async_db), user_in: UserCreate) -> Any:
     """Create new user."""
-    user = user_crud.get_by_email(db, email=user_in.email)
+    user = await user_crud.aget_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
-    user = user_crud.create(db, obj_in=user_in)
+    try:
+        user = await user_crud.acreate(db, obj_in=user_in)
+    except PasswordHashingOverloadedError as e:
+        raise _overloaded(e)
     return user
 
 @router.get("/me", response_model=User)
@@ -58,10 +72,13 @@ async def read_current_user(current_user: User = Depends(get_current_user)) -> A
 @router.put("/me", response_model=User)
 async def update_current_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """Update current user."""
-    user = user_crud.update(db, db_obj=current_user, obj_in=user_in)
+    try:
+        user = await user_crud.aupdate(db, db_obj=current_user, obj_in=user_in)
+    except PasswordHashingOverloadedError as e:
+        raise _overloaded(e)
     return user
\ No newline at end of file
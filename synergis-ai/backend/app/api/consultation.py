@@ -1,10 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
+from uuid import uuid4
+import json
 
-from ..services.llm import LLMService
+from ..core.config import settings
+from ..core.security import get_current_active_user, get_optional_user, get_user_from_token
+from ..crud.consultation_history import consultation_message, consultation_session
+from ..db.batch_writer import BatchWriter
+from ..db.session import AsyncSessionLocal, get_async_db
+from ..schemas.feedback import FeedbackCreate
+from ..schemas.interaction import InteractionCreate
+from ..services.llm import LLMService, InferenceOverloadedError
+from ..services.pipeline import ConsultationPipeline
 from ..services.recommendation import RecommendationService
+from ..services.registry import (
+    services, get_consultation_pipeline, get_feedback_writer, get_interaction_writer, get_llm_service,
+    get_recommendation_service
+)
 from ..models.consultation import ConsultationResponse
 
 router = APIRouter(prefix="/consultation", tags=["consultation"])
@@ -12,57 +29,241 @@ router = APIRouter(prefix="/consultation", tags=["consultation"])
 class Message(BaseModel):
     content: str
     context: Optional[dict] = None
+    session_id: Optional[str] = None
 
 class ConsultationHistory(BaseModel):
     messages: List[Message]
     metadata: Optional[dict] = None
 
+def _overloaded(error: InferenceOverloadedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 @router.post("/", response_model=ConsultationResponse)
-async def create_consultation(message: Message):
+async def create_consultation(
+    message: Message,
+    response: Response,
+    pipeline: ConsultationPipeline = Depends(get_consultation_pipeline),
+    current_user: Any = Depends(get_optional_user),
+):
     """Create a new consultation message and get AI response"""
     try:
-        # Initialize services
-        llm_service = LLMService()
-        recommendation_service = RecommendationService()
-
-        # Process the message with LLM
-        response = await llm_service.process_message(
-            message.content,
-            context=message.context
-        )
+        # Keep the conversation going in the caller's session, or start a new one
+        session_id = message.session_id or uuid4().hex
+        response.headers["X-Session-ID"] = session_id
 
-        # Get product/service recommendations
-        recommendations = await recommendation_service.get_recommendations(
+        # Generate the response while recommendations are shortlisted in parallel
+        ai_response, recommendations, timings = await pipeline.run(
             message.content,
-            response
+            context=message.context,
+            session_id=session_id,
+            # Signed-in users get recommendations personalized to their preferences
+            user_id=str(current_user.id) if current_user is not None else None
         )
+        response.headers["Server-Timing"] = timings.server_timing()
 
         return ConsultationResponse(
-            message=response,
+            message=ai_response,
             recommendations=recommendations,
             timestamp=datetime.now()
         )
 
+    except InferenceOverloadedError as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/history/{session_id}", response_model=ConsultationHistory)
-async def get_consultation_history(session_id: str):
-    """Get consultation history for a specific session"""
+async def _consultation_events(
+    message: Message,
+    session_id: str,
+    pipeline: ConsultationPipeline,
+    user_id: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (event, data) pairs for a streamed consultation turn"""
+    yield "session", {"session_id": session_id}
     try:
-        # TODO: Implement consultation history retrieval
-        return ConsultationHistory(
-            messages=[],
-            metadata={"session_id": session_id}
-        )
+        # Recommendations are re-ranked against the full response, so they arrive last
+        async for event, data in pipeline.stream(
+            message.content,
+            context=message.context,
+            session_id=session_id,
+            user_id=user_id
+        ):
+            if event == "timings":
+                yield "done", {"timestamp": datetime.now(), "timings": data}
+            else:
+                yield event, data
+
     except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        yield "error", {"detail": str(e)}
+
+def _format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.post("/stream")
+async def stream_consultation(
+    message: Message,
+    llm_service: LLMService = Depends(get_llm_service),
+    pipeline: ConsultationPipeline = Depends(get_consultation_pipeline),
+    current_user: Any = Depends(get_optional_user),
+):
+    """Stream the AI response token by token as Server-Sent Events"""
+    # Reject up front, once the stream has started the status code is sent
+    try:
+        llm_service.scheduler.ensure_capacity()
+    except InferenceOverloadedError as e:
+        raise _overloaded(e)
+
+    session_id = message.session_id or uuid4().hex
+    user_id = str(current_user.id) if current_user is not None else None
+    events = _consultation_events(message, session_id, pipeline, user_id)
+
+    async def event_stream():
+        async for event, data in events:
+            yield _format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "X-Session-ID": session_id,
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+@router.websocket("/ws")
+async def consultation_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Stream AI responses token by token over a WebSocket connection"""
+    if not services.ready:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    # Browsers cannot set headers on a WebSocket, the access token comes as a query parameter
+    user_id = None
+    if token is not None:
+        async with AsyncSessionLocal() as db:
+            user = await get_user_from_token(db, token)
+        if user is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        user_id = str(user.id)
+
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                # Binary frames raise KeyError, malformed JSON a ValueError
+                payload = json.loads(await websocket.receive_text())
+            except (KeyError, ValueError):
+                await websocket.send_json({"event": "error", "data": {"detail": "Messages must be JSON text frames"}})
+                continue
+            try:
+                message = Message(**payload)
+            except (TypeError, ValidationError) as e:
+                await websocket.send_json({"event": "error", "data": {"detail": str(e)}})
+                continue
+
+            session_id = message.session_id or uuid4().hex
+            async for event, data in _consultation_events(message, session_id, services.consultation, user_id):
+                await websocket.send_json({"event": event, "data": jsonable_encoder(data)})
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/history/{session_id}", response_model=ConsultationHistory)
+async def get_consultation_history(
+    session_id: str,
+    before: Optional[int] = Query(None, description="Cursor from the previous page's next_cursor"),
+    limit: int = Query(settings.CONSULTATION_HISTORY_PAGE_SIZE, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get consultation history for a specific session, one page at a time from the newest message"""
+    rows = await consultation_message.aget_page(db, session_id=session_id, before=before, limit=limit)
+    summary = None
+    recent = None
+    if services.llm is not None:
+        recent = services.llm.memory_store.get_history(session_id)
+        if recent is not None:
+            summary = recent[0]
+
+    messages = [
+        Message(
+            content=row.content,
+            context={"role": row.role, "created_at": row.created_at.isoformat()},
+            session_id=session_id
+        )
+        for row in reversed(rows)
+    ]
+    next_cursor = rows[-1].id if len(rows) == limit else None
+
+    if not rows and before is None:
+        if recent is not None:
+            # Turns are persisted in the background, a brand new session may not be written yet
+            for user_message, ai_message in recent[1]:
+                messages.append(Message(content=user_message, context={"role": "user"}, session_id=session_id))
+                messages.append(Message(content=ai_message, context={"role": "assistant"}, session_id=session_id))
+        elif await consultation_session.aget(db, session_id) is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+    return ConsultationHistory(
+        messages=messages,
+        metadata={"session_id": session_id, "summary": summary, "next_cursor": next_cursor}
+    )
 
 @router.post("/feedback")
-async def submit_feedback(session_id: str, rating: int, feedback: Optional[str] = None):
+async def submit_feedback(
+    session_id: str,
+    rating: int = Query(..., ge=1, le=5),
+    feedback: Optional[str] = None,
+    writer: BatchWriter[FeedbackCreate] = Depends(get_feedback_writer),
+):
     """Submit feedback for a consultation session"""
+    # Only queued here, the writer inserts feedback in bulk in the background
+    accepted = writer.submit(FeedbackCreate(
+        session_id=session_id,
+        rating=rating,
+        comment=feedback,
+        created_at=datetime.utcnow()
+    ))
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too much feedback is waiting to be stored, try again shortly",
+            headers={"Retry-After": str(max(1, round(writer.flush_seconds)))},
+        )
+    return {"status": "success", "message": "Feedback submitted successfully"}
+
+@router.post("/recommendations/{item_id}/interactions")
+async def record_interaction(
+    item_id: str,
+    event_type: str = Query("select", max_length=32),
+    weight: float = Query(1.0, ge=-1.0, le=5.0, description="Negative for items the user turned down"),
+    recommendation: RecommendationService = Depends(get_recommendation_service),
+    writer: BatchWriter[InteractionCreate] = Depends(get_interaction_writer),
+    current_user: Any = Depends(get_current_active_user),
+):
+    """Record that the current user interacted with a recommended item"""
+    if recommendation.catalog is None or item_id not in recommendation.catalog:
+        raise HTTPException(status_code=404, detail="Item not found")
+    # Stored for the next training run, the preference vector reflects it right away
+    accepted = writer.submit(InteractionCreate(
+        user_id=str(current_user.id),
+        item_id=item_id,
+        event_type=event_type,
+        weight=weight,
+        created_at=datetime.utcnow()
+    ))
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many interactions are waiting to be stored, try again shortly",
+            headers={"Retry-After": str(max(1, round(writer.flush_seconds)))},
+        )
     try:
-        # TODO: Implement feedback submission
-        return {"status": "success", "message": "Feedback submitted successfully"}
+        await recommendation.update_user_preferences(str(current_user.id), {"item_id": item_id, "weight": weight})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "message": "Interaction recorded successfully"}
@@ -0,0 +1,55 @@
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.core.security import get_current_active_superuser
+from app.schemas.job import Job, JobCreate
+from app.services.jobs import JobManager
+from app.services.registry import get_job_manager
+
+router = APIRouter()
+
+@router.post("/", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_in: JobCreate,
+    manager: JobManager = Depends(get_job_manager),
+    current_user: Any = Depends(get_current_active_superuser),
+) -> Any:
+    """Queue a background job; poll GET /jobs/{job_id} for its progress."""
+    try:
+        return await manager.submit(job_in.type, job_in.params)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/", response_model=List[Job])
+async def list_jobs(
+    type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    manager: JobManager = Depends(get_job_manager),
+    current_user: Any = Depends(get_current_active_superuser),
+) -> Any:
+    """List the most recently submitted jobs."""
+    return await manager.list(job_type=type, limit=limit)
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: str,
+    manager: JobManager = Depends(get_job_manager),
+    current_user: Any = Depends(get_current_active_superuser),
+) -> Any:
+    """Get the status and progress of a job."""
+    job = await manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(
+    job_id: str,
+    manager: JobManager = Depends(get_job_manager),
+    current_user: Any = Depends(get_current_active_superuser),
+) -> Any:
+    """Cancel a queued job, or ask a running one to stop."""
+    job = await manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
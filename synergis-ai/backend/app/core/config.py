@@ -1,4 +1,4 @@
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import AnyHttpUrl, BaseSettings, EmailStr, validator
 from pydantic_settings import BaseSettings
 
@@ -12,6 +12,15 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 5.0
     
     # Server Configuration
     SERVER_HOST: str = "0.0.0.0"
@@ -20,6 +29,12 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT_SECONDS: int = 30
+    DATABASE_POOL_RECYCLE_SECONDS: int = 3600
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
     
     # CORS Configuration
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -50,6 +65,103 @@ class Settings(BaseSettings):
     LLM_MODEL_PATH: str
     LLM_MODEL_TYPE: str = "gpt4all"
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_PATH: Optional[str] = "data/embedding_cache.sqlite3"
+    EMBEDDING_BATCH_WINDOW_MS: int = 5
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    
+    # Inference Scheduling
+    LLM_WORKERS: int = 1
+    LLM_THREADS_PER_WORKER: Optional[int] = None
+    LLM_QUEUE_MAX_SIZE: int = 32
+    LLM_QUEUE_MAX_WAIT_SECONDS: float = 30.0
+    LLM_BATCH_ENABLED: bool = False
+    LLM_BATCH_WINDOW_MS: int = 10
+    LLM_BATCH_MAX_SIZE: int = 8
+    
+    # Response Cache
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory" or "redis"
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    
+    # Recommendation Index
+    RECOMMENDATION_STORE_PATH: Optional[str] = "data/recommendation"
+    RECOMMENDATION_RELOAD_INTERVAL_SECONDS: int = 30
+    RECOMMENDATION_CANDIDATES: int = 50
+    RECOMMENDATION_INDEX: str = "exact"  # "exact" or "ivf"
+    RECOMMENDATION_ANN_MIN_ITEMS: int = 50000
+    RECOMMENDATION_ANN_LISTS: Optional[int] = None
+    RECOMMENDATION_ANN_PROBES: int = 8
+    RECOMMENDATION_ANN_INDEX_PATH: Optional[str] = "data/catalog_ivf.npz"
+    
+    # User Preferences
+    RECOMMENDATION_PREFERENCE_DECAY: float = 0.1
+    RECOMMENDATION_PREFERENCE_WEIGHT: float = 0.3
+    RECOMMENDATION_PREFERENCE_BATCH_SIZE: int = 256
+    RECOMMENDATION_PREFERENCE_FLUSH_SECONDS: float = 5.0
+    
+    # Recommendation Training
+    RECOMMENDATION_TRAIN_CHUNK_SIZE: int = 50000
+    RECOMMENDATION_TRAIN_EPOCHS: int = 5
+    RECOMMENDATION_TRAIN_BATCH_SIZE: int = 4096
+    RECOMMENDATION_TRAIN_LEARNING_RATE: float = 0.05
+    RECOMMENDATION_TRAIN_REGULARIZATION: float = 0.01
+    RECOMMENDATION_TRAIN_WORKERS: int = 2
+    
+    # Knowledge Base Ingestion
+    KB_CHUNK_SIZE: int = 1000
+    KB_CHUNK_OVERLAP: int = 100
+    KB_INGEST_BATCH_SIZE: int = 64
+    KB_INGEST_WORKERS: int = 2
+    KB_SOURCE_DIRECTORY: str = "data/knowledge_base"  # JSON-lines sources for knowledge_base jobs
+
+    # Retrieval
+    RETRIEVAL_K: int = 4
+    RETRIEVAL_SEARCH_TYPE: str = "similarity"  # "similarity" or "mmr"
+    RETRIEVAL_FETCH_K: int = 20
+    RETRIEVAL_MMR_LAMBDA: float = 0.5
+    RETRIEVAL_SCORE_THRESHOLD: Optional[float] = None
+    RETRIEVAL_MAX_CONTEXT_TOKENS: int = 768
+    RETRIEVAL_CACHE_SIZE: int = 1024
+    RETRIEVAL_RERANK_MODEL: Optional[str] = None  # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RETRIEVAL_RERANK_CANDIDATES: int = 20
+    RETRIEVAL_RERANK_TOP_N: int = 3
+    RETRIEVAL_RERANK_BATCH_SIZE: int = 32
+    RETRIEVAL_RERANK_MIN_SCORE: Optional[float] = None
+    RETRIEVAL_HYBRID: bool = True
+    RETRIEVAL_LEXICAL_K: int = 20
+    RETRIEVAL_LEXICAL_MAX_DF: float = 0.5
+    RETRIEVAL_LEXICAL_MIN_MATCH: float = 0.5
+    RETRIEVAL_LEXICAL_MIN_SCORE: Optional[float] = None
+    RETRIEVAL_RRF_K: int = 60
+    RETRIEVAL_KEYWORD_MAX_TERMS: int = 4
+
+    # Background Jobs
+    JOB_CONCURRENCY: Dict[str, int] = {"knowledge_base": 1, "recommendation_training": 1}
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_HEARTBEAT_SECONDS: float = 10.0
+    JOB_STALE_SECONDS: float = 60.0
+    JOB_KNOWLEDGE_BASE_SLICE_SIZE: int = 500
+
+    # Conversation Memory
+    MEMORY_MAX_TOKENS: int = 1000
+    MEMORY_MAX_SESSIONS: int = 1000
+    MEMORY_SESSION_TTL_SECONDS: int = 3600
+
+    # Consultation History
+    CONSULTATION_HISTORY_ENABLED: bool = True
+    CONSULTATION_HISTORY_BATCH_SIZE: int = 200
+    CONSULTATION_HISTORY_FLUSH_SECONDS: float = 1.0
+    CONSULTATION_HISTORY_MAX_QUEUE: int = 10000
+    CONSULTATION_HISTORY_PAGE_SIZE: int = 50
+    FEEDBACK_BATCH_SIZE: int = 500
+    FEEDBACK_FLUSH_SECONDS: float = 2.0
+    FEEDBACK_MAX_QUEUE: int = 50000
+    INTERACTION_BATCH_SIZE: int = 500
+    INTERACTION_FLUSH_SECONDS: float = 2.0
+    INTERACTION_MAX_QUEUE: int = 50000
     
     # Vector Store Configuration
     CHROMA_HOST: str
@@ -58,6 +170,12 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis"
+    RATE_LIMIT_USER_REQUESTS: Optional[int] = None  # defaults to RATE_LIMIT_REQUESTS
+    RATE_LIMIT_ROUTES: Dict[str, int] = {  # path prefixes under API_V1_STR
+        "/auth/login": 10,
+        "/auth/signup": 5,
+    }
     
     # Logging
     LOG_LEVEL: str = "INFO"
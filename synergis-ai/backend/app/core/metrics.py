@@ -0,0 +1,21 @@
+from typing import Any, Callable, Dict
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register_collector(namespace: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """Register a callable returning numeric stats to expose under a namespace."""
+    _collectors[namespace] = collector
+
+def unregister_collector(namespace: str) -> None:
+    _collectors.pop(namespace, None)
+
+def render_metrics() -> str:
+    """Render every registered collector in the Prometheus text format."""
+    lines = []
+    for namespace, collector in _collectors.items():
+        for key, value in collector().items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"synergis_{namespace}_{key} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,132 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+
+def build_context(rounds: int) -> CryptContext:
+    # Pinning min and max rounds to the configured cost makes any hash with
+    # another cost report needs_update, so it is rehashed on the next login
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+class PasswordHashingOverloadedError(Exception):
+    """Raised when a hashing request cannot be started in time"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool instead of the event loop.
+
+    bcrypt releases the GIL, so ``workers`` threads hash in parallel while
+    the event loop keeps serving other requests. At most ``max_queue``
+    requests may wait for a worker, each for at most ``queue_timeout``
+    seconds; beyond that callers get ``PasswordHashingOverloadedError``.
+    """
+
+    def __init__(
+        self,
+        rounds: int = 12,
+        workers: int = 4,
+        max_queue: int = 64,
+        queue_timeout: float = 5.0,
+    ):
+        self.context = build_context(rounds)
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+
+        self.operations = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._hash_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_hash_seconds = 0.0
+
+    def _retry_after(self) -> int:
+        average = self._hash_seconds / self.operations if self.operations else 0.25
+        return max(1, math.ceil(average * (self._waiting + 1) / self.workers))
+
+    async def _run(self, fn: Any, *args: Any) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        queued = time.perf_counter()
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHashingOverloadedError("Too many pending password checks", self._retry_after())
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise PasswordHashingOverloadedError("Timed out waiting to check password", self._retry_after())
+            finally:
+                self._waiting -= 1
+
+        started = time.perf_counter()
+        self._wait_seconds += started - queued
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._semaphore.release()
+            elapsed = time.perf_counter() - started
+            self.operations += 1
+            self._hash_seconds += elapsed
+            self._max_hash_seconds = max(self._max_hash_seconds, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password, also returning a new hash when the stored one uses another cost"""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "operations": self.operations,
+            "waiting": self._waiting,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_hash_seconds": round(self._hash_seconds / self.operations, 6) if self.operations else 0.0,
+            "max_hash_seconds": round(self._max_hash_seconds, 6),
+            "avg_wait_seconds": round(self._wait_seconds / self.operations, 6) if self.operations else 0.0,
+        }
+
+password_hasher = PasswordHasher(
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+)
+register_collector("password_hashing", password_hasher.stats)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return password_hasher.context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    return password_hasher.context.hash(password)
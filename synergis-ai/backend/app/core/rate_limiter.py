@@ -1,84 +1,282 @@
-from datetime import datetime, timedelta
-from typing import Dict, Tuple
-from fastapi import Request, HTTPException
+import math
+import time
+from typing import Dict, List, Optional, Tuple
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from jose import jwt
+from loguru import logger
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.core.redis import get_redis
+from app.core.user_cache import token_cache
+
+class RateLimitResult:
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+def _estimate(previous: int, current: int, elapsed: float, window: int) -> float:
+    # Sliding window counter: the previous window's count is weighted by how
+    # much of it still overlaps the sliding window ending now
+    return previous * (window - elapsed) / window + current
+
+def _result(allowed: bool, previous: int, current: int, elapsed: float, limit: int, window: int) -> RateLimitResult:
+    estimate = _estimate(previous, current, elapsed, window)
+    if allowed:
+        return RateLimitResult(True, limit, max(0, int(limit - estimate)), 0)
+    if current >= limit or previous == 0:
+        retry_after = window - elapsed
+    else:
+        # Time until the previous window's weight has decayed below the limit
+        retry_after = (estimate - limit + 1) * window / previous
+    return RateLimitResult(False, limit, 0, max(1, math.ceil(retry_after)))
+
+Check = Tuple[str, int]
+
+class InMemoryRateLimitBackend:
+    """Per-process sliding window counters with O(1) state per key.
+
+    Each key holds its current window index and the counts of the current
+    and previous windows. Keys idle for two windows are swept periodically.
+    """
+
+    def __init__(self, sweep_interval_seconds: int = 60):
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._counters: Dict[Tuple[str, int], List[int]] = {}
+        self._last_sweep = time.time()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        idle = [
+            key for key, (index, _, _) in self._counters.items()
+            if index < int(now // key[1]) - 1
+        ]
+        for key in idle:
+            del self._counters[key]
+
+    def _counter(self, key: str, window: int, index: int) -> List[int]:
+        counter = self._counters.get((key, window))
+        if counter is None:
+            counter = self._counters[(key, window)] = [index, 0, 0]
+        elif counter[0] != index:
+            # Roll over; anything older than the previous window no longer counts
+            counter[2] = counter[1] if counter[0] == index - 1 else 0
+            counter[1] = 0
+            counter[0] = index
+        return counter
+
+    async def hit(self, checks: List[Check], window: int) -> List[RateLimitResult]:
+        """Count the request against every (key, limit) check, or against none if any is exhausted"""
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval_seconds:
+            self._sweep(now)
+
+        index, elapsed = int(now // window), now % window
+        counters = [self._counter(key, window, index) for key, _ in checks]
+        allowed = all(
+            _estimate(previous, current, elapsed, window) < limit
+            for (_, limit), (_, current, previous) in zip(checks, counters)
+        )
+        results = []
+        for (_, limit), counter in zip(checks, counters):
+            if allowed:
+                counter[1] += 1
+            _, current, previous = counter
+            passed = allowed or _estimate(previous, current, elapsed, window) < limit
+            results.append(_result(passed, previous, current, elapsed, limit, window))
+        return results
+
+# Atomically check the sliding window estimate of every (current, previous)
+# key pair and count the request in all of them only if all allow it
+_SLIDING_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[1])
+local elapsed = tonumber(ARGV[2])
+local allowed = 1
+local counts = {}
+for i = 1, #KEYS / 2 do
+    local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    if previous * (window - elapsed) / window + current >= tonumber(ARGV[2 + i]) then
+        allowed = 0
+    end
+    counts[2 * i] = current
+    counts[2 * i + 1] = previous
+end
+if allowed == 1 then
+    for i = 1, #KEYS / 2 do
+        counts[2 * i] = redis.call('INCR', KEYS[2 * i - 1])
+        if counts[2 * i] == 1 then
+            redis.call('EXPIRE', KEYS[2 * i - 1], window * 2)
+        end
+    end
+end
+counts[1] = allowed
+return counts
+"""
+
+class RedisRateLimitBackend:
+    """Sliding window counters in Redis, shared by every worker process.
+
+    A Lua script reads both windows and increments the current one in a
+    single atomic step, so concurrent workers can never overshoot the limit.
+    Counters expire on their own, so idle keys need no sweeping.
+    """
+
+    prefix = "synergis:ratelimit"
+
+    def __init__(self):
+        self.redis = get_redis()
+        if self.redis is None:
+            raise Exception("Redis rate limiting requires REDIS_HOST to be set")
+        self._script = self.redis.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    async def hit(self, checks: List[Check], window: int) -> List[RateLimitResult]:
+        """Count the request against every (key, limit) check, or against none if any is exhausted"""
+        now = time.time()
+        index, elapsed = int(now // window), now % window
+        keys = []
+        for key, _ in checks:
+            keys += [f"{self.prefix}:{key}:{window}:{index}", f"{self.prefix}:{key}:{window}:{index - 1}"]
+        allowed, *counts = await self._script(
+            keys=keys, args=[window, elapsed] + [limit for _, limit in checks]
+        )
+        results = []
+        for i, (_, limit) in enumerate(checks):
+            current, previous = int(counts[2 * i]), int(counts[2 * i + 1])
+            passed = bool(allowed) or _estimate(previous, current, elapsed, window) < limit
+            results.append(_result(passed, previous, current, elapsed, limit, window))
+        return results
+
+class RateLimiter:
+    """Sliding-window rate limits per client, per authenticated user and per route.
+
+    Anonymous requests are limited per client IP and authenticated ones per
+    user id. ``route_limits`` maps path prefixes to a tighter per-client
+    budget for that route, checked in addition to the global one.
+
+    Implemented as plain ASGI middleware: unlike ``BaseHTTPMiddleware`` it
+    adds no extra task or body-stream wrapping, so streaming responses pass
+    through untouched.
+    """
 
-class RateLimiter(BaseHTTPMiddleware):
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         requests_limit: int = 100,
         window_seconds: int = 60,
-        exclude_paths: list = None
+        exclude_paths: list = None,
+        user_requests_limit: Optional[int] = None,
+        route_limits: Optional[Dict[str, int]] = None,
+        backend: str = "memory",
     ):
-        super().__init__(app)
+        self.app = app
         self.requests_limit = requests_limit
         self.window_seconds = window_seconds
-        self.exclude_paths = exclude_paths or []
-        self.requests: Dict[str, list] = {}
-
-    async def dispatch(self, request: Request, call_next):
-        if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
-
-        client_ip = request.client.host
-        current_time = datetime.now()
-
-        # Clean up old requests
-        if client_ip in self.requests:
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if current_time - req_time < timedelta(seconds=self.window_seconds)
-            ]
-
-        # Check rate limit
-        if self._is_rate_limited(client_ip, current_time):
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "detail": "Too many requests",
-                    "retry_after": self._get_retry_after(client_ip)
-                }
-            )
+        self.exclude_paths = tuple(exclude_paths or [])
+        self.user_requests_limit = user_requests_limit or requests_limit
+        # Longest prefix first so the most specific route rule wins
+        self.route_limits = sorted((route_limits or {}).items(), key=lambda rule: -len(rule[0]))
+        self.backend = RedisRateLimitBackend() if backend == "redis" else InMemoryRateLimitBackend(window_seconds)
+        self.errors = 0
+        self.rejected = 0
+        register_collector("rate_limiter", self.stats)
 
-        # Add current request
-        if client_ip not in self.requests:
-            self.requests[client_ip] = []
-        self.requests[client_ip].append(current_time)
+    @staticmethod
+    def _token_subject(token: str) -> Optional[str]:
+        """Subject of a validly signed access token, checked without touching the database"""
+        user_id = token_cache.get(token)
+        if user_id is not None:
+            return user_id
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except jwt.JWTError:
+            return None
+        user_id = payload.get("sub")
+        if user_id is not None:
+            token_cache.put(token, user_id, expires_at=payload.get("exp"))
+        return user_id
 
-        response = await call_next(request)
-        return response
+    def _identity(self, scope: Scope) -> Tuple[str, int]:
+        # The signature is verified here, so every worker derives the same key
+        # for a token and a forged one cannot claim another user's budget
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            user_id = self._token_subject(authorization[7:].strip())
+            if user_id is not None:
+                return f"user:{user_id}", self.user_requests_limit
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", self.requests_limit
 
-    def _is_rate_limited(self, client_ip: str, current_time: datetime) -> bool:
-        if client_ip not in self.requests:
-            return False
+    def _route_limit(self, path: str) -> Optional[Tuple[str, int]]:
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
 
-        window_start = current_time - timedelta(seconds=self.window_seconds)
-        request_count = len([
-            req_time for req_time in self.requests[client_ip]
-            if req_time > window_start
-        ])
+    async def check(self, scope: Scope) -> RateLimitResult:
+        """Count the request against every limit that applies and return the tightest result"""
+        identity, limit = self._identity(scope)
+        checks = [(identity, limit)]
+        route = self._route_limit(scope["path"])
+        if route is not None:
+            checks.append((f"route:{route[0]}:{identity}", route[1]))
 
-        return request_count >= self.requests_limit
+        # All limits are checked before any is counted, so a request rejected
+        # by the route limit does not use up the global budget
+        results = await self.backend.hit(checks, self.window_seconds)
+        rejected = [result for result in results if not result.allowed]
+        if rejected:
+            return max(rejected, key=lambda result: result.retry_after)
+        return min(results, key=lambda result: result.remaining)
 
-    def _get_retry_after(self, client_ip: str) -> int:
-        if not self.requests[client_ip]:
-            return 0
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
 
-        oldest_request = min(self.requests[client_ip])
-        time_passed = datetime.now() - oldest_request
-        return max(0, self.window_seconds - int(time_passed.total_seconds()))
+        try:
+            result = await self.check(scope)
+        except Exception as e:
+            # Fail open, an unavailable limiter backend must not take the API down
+            self.errors += 1
+            logger.warning(f"Rate limiter unavailable: {str(e)}")
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+        }
+        if not result.allowed:
+            self.rejected += 1
+            headers["Retry-After"] = str(result.retry_after)
+            response = JSONResponse(
+                status_code=429,
+                content={
+                    "detail": "Too many requests",
+                    "retry_after": result.retry_after
+                },
+                headers=headers,
+            )
+            await response(scope, receive, send)
+            return
 
-    def _get_window_stats(self, client_ip: str) -> Tuple[int, int]:
-        if client_ip not in self.requests:
-            return 0, self.requests_limit
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
 
-        current_time = datetime.now()
-        window_start = current_time - timedelta(seconds=self.window_seconds)
-        request_count = len([
-            req_time for req_time in self.requests[client_ip]
-            if req_time > window_start
-        ])
+        await self.app(scope, receive, send_with_headers)
 
-        return request_count, self.requests_limit
\ No newline at end of file
+    def stats(self) -> Dict[str, int]:
+        stats = {"rejected": self.rejected, "errors": self.errors}
+        if isinstance(self.backend, InMemoryRateLimitBackend):
+            stats["keys"] = len(self.backend)
+        return stats
@@ -0,0 +1,26 @@
+from typing import Optional
+from redis import asyncio as aioredis
+
+from app.core.config import settings
+
+_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """Get the shared Redis client, or None when Redis is not configured."""
+    global _client
+    if not settings.REDIS_HOST:
+        return None
+    if _client is None:
+        _client = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT or 6379,
+            password=settings.REDIS_PASSWORD,
+        )
+    return _client
+
+async def close_redis() -> None:
+    """Close the shared Redis connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
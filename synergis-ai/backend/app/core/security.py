@@ -1,20 +1,23 @@
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Union
 from jose import jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.db.session import get_db
+from app.core.passwords import get_password_hash, verify_password  # noqa: F401 re-exported
+from app.core.user_cache import token_cache, user_cache
+from app.db.session import get_async_db
 from app.crud.user import user as user_crud
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
+# For endpoints that also serve anonymous callers
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False
+)
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -31,33 +34,48 @@ def create_access_token(
     )
     return encoded_jwt
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_user_from_token(db: AsyncSession, token: str):
+    """Resolve a bearer token to its user, or None if it is invalid or the user is gone"""
+    user_id = token_cache.get(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+        except jwt.JWTError:
+            return None
+        user_id = payload.get("sub")
+        if user_id is None:
+            return None
+        token_cache.put(token, user_id, expires_at=payload.get("exp"))
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    # User rows rarely change, serve them from the cache and skip the query
+    user = await user_cache.get(user_crud.model, user_id)
+    if user is None:
+        user = await user_crud.aget(db, id=user_id)
+        if user is None:
+            return None
+        await user_cache.set(user)
+    return user
 
-async def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except jwt.JWTError:
-        raise credentials_exception
-    
-    user = user_crud.get(db, id=user_id)
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
+    user = await get_user_from_token(db, token)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
+async def get_optional_user(
+    db: AsyncSession = Depends(get_async_db), token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    """The authenticated user, or None for anonymous requests; a bad token is still rejected"""
+    if token is None:
+        return None
+    return await get_current_user(db, token)
+
 async def get_current_active_user(current_user = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
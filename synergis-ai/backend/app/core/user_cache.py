@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.core.redis import get_redis
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+class TTLCache(Generic[K, V]):
+    """Small in-process LRU cache whose entries expire"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V, expires_at: Optional[float] = None) -> None:
+        ttl_expiry = time.time() + self.ttl_seconds
+        self._entries[key] = (min(ttl_expiry, expires_at) if expires_at else ttl_expiry, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+class UserCache:
+    """Two-tier cache of user rows for authenticated requests.
+
+    Rows are kept briefly in process and for longer in Redis when it is
+    configured, and are rebuilt as detached ORM instances so callers can
+    still pass them to CRUD updates. Updates and removals invalidate both
+    tiers; other workers' in-process copies expire after ``ttl_seconds``.
+    Credential columns are never cached, they stay unloaded on the copies
+    and password checks keep reading them from the database.
+    """
+
+    prefix = "synergis:user"
+    excluded_columns = frozenset({"hashed_password"})
+
+    def __init__(self, ttl_seconds: float = 30, redis_ttl_seconds: int = 300, max_entries: int = 10000):
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self._local: TTLCache[str, Dict[str, Any]] = TTLCache(max_entries, ttl_seconds)
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._tasks = set()
+
+    def _key(self, user_id: Any) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    def _dump(self, user: Any) -> Dict[str, Any]:
+        return {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(type(user)).column_attrs
+            if attr.key not in self.excluded_columns
+        }
+
+    @staticmethod
+    def _load(model: Any, row: Dict[str, Any]) -> Any:
+        user = model(**row)
+        make_transient_to_detached(user)
+        return user
+
+    @staticmethod
+    def _encode_value(value: Any) -> Any:
+        # datetime is a date subclass, test it first
+        if isinstance(value, datetime):
+            return {"__datetime__": value.isoformat()}
+        if isinstance(value, date):
+            return {"__date__": value.isoformat()}
+        return value
+
+    @staticmethod
+    def _decode_value(value: Any) -> Any:
+        if isinstance(value, dict):
+            if "__datetime__" in value:
+                return datetime.fromisoformat(value["__datetime__"])
+            if "__date__" in value:
+                return date.fromisoformat(value["__date__"])
+        return value
+
+    def _encode(self, row: Dict[str, Any]) -> str:
+        return json.dumps({key: self._encode_value(value) for key, value in row.items()})
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        return {key: self._decode_value(value) for key, value in json.loads(raw).items()}
+
+    async def get(self, model: Any, user_id: Any) -> Optional[Any]:
+        """Get a detached copy of the cached user, or None on a miss"""
+        key = str(user_id)
+        row = self._local.get(key)
+        if row is not None:
+            self.hits += 1
+            return self._load(model, row)
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._key(key))
+            except Exception:
+                # A cache outage must never fail authentication
+                self.errors += 1
+                raw = None
+            if raw is not None:
+                row = self._decode(raw)
+                self._local.put(key, row)
+                self.redis_hits += 1
+                return self._load(model, row)
+
+        self.misses += 1
+        return None
+
+    async def set(self, user: Any) -> None:
+        row = self._dump(user)
+        key = str(row["id"])
+        self._local.put(key, row)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(self._key(key), self._encode(row), ex=self.redis_ttl_seconds)
+            except Exception:
+                self.errors += 1
+
+    async def invalidate(self, user_id: Any) -> None:
+        key = str(user_id)
+        self._local.pop(key)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.delete(self._key(key))
+            except Exception:
+                self.errors += 1
+
+    def discard(self, user_id: Any) -> None:
+        """Invalidate from sync code; the Redis copy is dropped when an event loop is running"""
+        self._local.pop(str(user_id))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._local),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+user_cache = UserCache(
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    redis_ttl_seconds=settings.USER_CACHE_REDIS_TTL_SECONDS,
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+)
+# Verified access tokens mapped to their subject, so repeated JWT decodes are skipped
+token_cache: TTLCache[str, str] = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+
+register_collector("user_cache", user_cache.stats)
@@ -1,6 +1,8 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.base import Base
@@ -75,4 +77,67 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .offset(skip)
             .limit(limit)
             .all()
-        )
\ No newline at end of file
+        )
+
+    # Async variants, for use with AsyncSession so endpoints do not block the event loop
+
+    async def aget(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        result = await db.execute(select(self.model).filter(self.model.id == id))
+        return result.scalars().first()
+
+    async def aget_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def acreate(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def abulk_create(self, db: AsyncSession, *, objs_in: List[CreateSchemaType]) -> int:
+        """Insert many rows with a single multi-row INSERT, without loading them back."""
+        if not objs_in:
+            return 0
+        # Not jsonable_encoder: datetimes must reach the driver as datetimes.
+        # Unset fields are left out so their column defaults apply, and rows are
+        # grouped by the fields they set since one VALUES list takes the first
+        # row's columns for all of them
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for obj_in in objs_in:
+            row = obj_in.model_dump(exclude_unset=True)
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for rows in groups.values():
+            await db.execute(insert(self.model).values(rows))
+        await db.commit()
+        return len(objs_in)
+
+    async def aupdate(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aremove(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        return obj
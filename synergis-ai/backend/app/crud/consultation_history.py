@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models.consultation_history import ConsultationMessage, ConsultationSession
+from app.schemas.consultation_history import ConsultationMessageCreate
+
+def _insert_ignoring_duplicates(db: AsyncSession, model: Any):
+    """INSERT ... ON CONFLICT DO NOTHING for the bound dialect."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise Exception(f"Unsupported database dialect for consultation history: {dialect}")
+    return insert(model).on_conflict_do_nothing()
+
+class CRUDConsultationMessage(
+    CRUDBase[ConsultationMessage, ConsultationMessageCreate, ConsultationMessageCreate]
+):
+    async def aappend(
+        self, db: AsyncSession, *, messages: List[ConsultationMessageCreate]
+    ) -> None:
+        """Insert a batch of messages in one transaction, creating their sessions as needed."""
+        if not messages:
+            return
+        now = datetime.utcnow()
+        session_ids = {message.session_id for message in messages}
+
+        await db.execute(
+            _insert_ignoring_duplicates(db, ConsultationSession),
+            [{"id": session_id, "created_at": now, "updated_at": now} for session_id in session_ids],
+        )
+        await db.execute(
+            update(ConsultationSession)
+            .where(ConsultationSession.id.in_(session_ids))
+            .values(updated_at=now)
+        )
+        await db.execute(
+            ConsultationMessage.__table__.insert(),
+            [
+                {
+                    "session_id": message.session_id,
+                    "role": message.role,
+                    "content": message.content,
+                    "created_at": message.created_at or now,
+                }
+                for message in messages
+            ],
+        )
+        await db.commit()
+
+    async def aget_page(
+        self,
+        db: AsyncSession,
+        *,
+        session_id: str,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[ConsultationMessage]:
+        """Get up to limit messages of a session older than the before cursor, newest first.
+
+        Keyset pagination on (session_id, id): each page is an index range
+        scan starting at the cursor, so the cost does not grow with how far
+        back the page is, unlike OFFSET.
+        """
+        query = select(ConsultationMessage).filter(ConsultationMessage.session_id == session_id)
+        if before is not None:
+            query = query.filter(ConsultationMessage.id < before)
+        result = await db.execute(query.order_by(ConsultationMessage.id.desc()).limit(limit))
+        return list(result.scalars().all())
+
+class CRUDConsultationSession(CRUDBase[ConsultationSession, BaseModel, BaseModel]):
+    pass
+
+consultation_message = CRUDConsultationMessage(ConsultationMessage)
+consultation_session = CRUDConsultationSession(ConsultationSession)
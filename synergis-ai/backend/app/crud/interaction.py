@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.models.interaction import Interaction
+from app.schemas.interaction import InteractionCreate
+
+class CRUDInteraction(CRUDBase[Interaction, InteractionCreate, InteractionCreate]):
+    def stream(
+        self,
+        db: Session,
+        *,
+        chunk_size: int = 50000,
+        since: Optional[datetime] = None,
+    ) -> Iterator[List[Tuple[str, str, float]]]:
+        """Yield (user_id, item_id, weight) rows in chunks using a server-side cursor.
+
+        Only one chunk is held in memory at a time, however large the table.
+        """
+        query = db.query(Interaction.user_id, Interaction.item_id, Interaction.weight)
+        if since is not None:
+            query = query.filter(Interaction.created_at >= since)
+        result = query.execution_options(stream_results=True, yield_per=chunk_size)
+
+        chunk: List[Tuple[str, str, float]] = []
+        for user_id, item_id, weight in result:
+            chunk.append((user_id, item_id, 1.0 if weight is None else weight))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+interaction = CRUDInteraction(Interaction)
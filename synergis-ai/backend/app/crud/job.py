@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models.job import Job
+from app.schemas.job import JobCreate
+
+_UNSET: Any = object()
+
+class CRUDJob(CRUDBase[Job, JobCreate, JobCreate]):
+    async def acreate(self, db: AsyncSession, *, obj_in: JobCreate) -> Job:
+        db_obj = Job(id=uuid4().hex, type=obj_in.type, params=obj_in.params, status="queued")
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aget_recent(
+        self, db: AsyncSession, *, type: Optional[str] = None, limit: int = 50
+    ) -> List[Job]:
+        query = select(Job)
+        if type is not None:
+            query = query.filter(Job.type == type)
+        result = await db.execute(query.order_by(Job.created_at.desc()).limit(limit))
+        return list(result.scalars().all())
+
+    async def aclaim(
+        self, db: AsyncSession, *, type: str, stale_before: datetime, limit: int
+    ) -> List[Job]:
+        """Mark up to limit runnable jobs of a type as running by this worker and return them.
+
+        Runnable means queued, or running with a heartbeat older than
+        stale_before because the worker running it died. Each job is claimed
+        with a conditional UPDATE, so concurrent workers never both win it.
+        """
+        runnable = and_(
+            Job.type == type,
+            Job.cancel_requested.is_(False),
+            or_(
+                Job.status == "queued",
+                and_(Job.status == "running", Job.heartbeat_at < stale_before),
+            ),
+        )
+        result = await db.execute(
+            select(Job.id).filter(runnable).order_by(Job.created_at).limit(limit)
+        )
+        now = datetime.utcnow()
+        claimed = []
+        for job_id in result.scalars().all():
+            outcome = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, runnable)
+                .values(
+                    status="running",
+                    heartbeat_at=now,
+                    started_at=func.coalesce(Job.started_at, now),
+                    attempts=Job.attempts + 1,
+                )
+            )
+            if outcome.rowcount == 1:
+                claimed.append(job_id)
+        await db.commit()
+        if not claimed:
+            return []
+        result = await db.execute(select(Job).filter(Job.id.in_(claimed)).order_by(Job.created_at))
+        return list(result.scalars().all())
+
+    async def aheartbeat(
+        self,
+        db: AsyncSession,
+        *,
+        id: str,
+        progress: Optional[Dict[str, Any]],
+        checkpoint: Any = _UNSET,
+    ) -> bool:
+        """Record that the job is alive, with its progress, and return whether it should stop."""
+        values: Dict[str, Any] = {"heartbeat_at": datetime.utcnow(), "progress": progress}
+        if checkpoint is not _UNSET:
+            values["checkpoint"] = checkpoint
+        await db.execute(update(Job).where(Job.id == id).values(**values))
+        cancel_requested = await db.scalar(select(Job.cancel_requested).filter(Job.id == id))
+        await db.commit()
+        return bool(cancel_requested)
+
+    async def afinish(
+        self,
+        db: AsyncSession,
+        *,
+        id: str,
+        status: str,
+        progress: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record the outcome of a run; "queued" hands the job back for a later resume."""
+        values: Dict[str, Any] = {"status": status, "progress": progress, "result": result, "error": error}
+        if status != "queued":
+            values["finished_at"] = datetime.utcnow()
+        await db.execute(update(Job).where(Job.id == id).values(**values))
+        await db.commit()
+
+    async def arequest_cancel(self, db: AsyncSession, *, id: str) -> Optional[Job]:
+        """Cancel a queued job outright, or flag a running one for its worker to stop."""
+        await db.execute(
+            update(Job)
+            .where(Job.id == id, Job.status == "queued")
+            .values(status="cancelled", cancel_requested=True, finished_at=datetime.utcnow())
+        )
+        await db.execute(
+            update(Job).where(Job.id == id, Job.status == "running").values(cancel_requested=True)
+        )
+        await db.commit()
+        return await self.aget(db, id)
+
+job = CRUDJob(Job)
@@ -1,7 +1,10 @@
 from typing import Any, Dict, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.passwords import get_password_hash, password_hasher, verify_password
+from app.core.user_cache import user_cache
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -35,8 +38,13 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
             
+        user_cache.discard(db_obj.id)
         return super().update(db, db_obj=db_obj, obj_in=update_data)
 
+    def remove(self, db: Session, *, id: int) -> User:
+        user_cache.discard(id)
+        return super().remove(db, id=id)
+
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
         if not user:
@@ -45,6 +53,59 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
 
+    async def aget_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def acreate(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        db_obj = User(
+            email=obj_in.email,
+            hashed_password=await password_hasher.hash(obj_in.password),
+            full_name=obj_in.full_name,
+            is_superuser=obj_in.is_superuser,
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def aupdate(
+        self, db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+
+        if update_data.get("password"):
+            hashed_password = await password_hasher.hash(update_data["password"])
+            del update_data["password"]
+            update_data["hashed_password"] = hashed_password
+
+        user = await super().aupdate(db, db_obj=db_obj, obj_in=update_data)
+        await user_cache.invalidate(user.id)
+        return user
+
+    async def aremove(self, db: AsyncSession, *, id: int) -> User:
+        user = await super().aremove(db, id=id)
+        await user_cache.invalidate(id)
+        return user
+
+    async def aauthenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
+        user = await self.aget_by_email(db, email=email)
+        if not user:
+            return None
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
+            return None
+        if new_hash is not None:
+            # The hashing cost changed since this password was stored
+            user.hashed_password = new_hash
+            db.add(user)
+            await db.commit()
+            await user_cache.invalidate(user.id)
+        return user
+
     def is_active(self, user: User) -> bool:
         return user.is_active
 
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+# Queued by stop() behind the pending records
+_STOP = object()
+
+class BatchWriter(Generic[T]):
+    """Write-behind queue that persists records in batches off the request path.
+
+    ``submit`` never blocks or touches the database: records are queued and
+    a background task hands them to ``write`` in batches of up to
+    ``batch_size``, at the latest ``flush_seconds`` after the first record
+    of a batch arrived. When the queue is full new records are dropped and
+    counted instead of slowing requests down. ``stop`` writes every record
+accepted before it was called, including a partially collected batch.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[List[T]], Awaitable[None]],
+        batch_size: int = 200,
+        flush_seconds: float = 1.0,
+        max_queue: int = 10000,
+    ):
+        self.name = name
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "asyncio.Queue[T]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, record: T) -> bool:
+        """Queue a record for writing, returning False if it had to be dropped"""
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _next_batch(self) -> Tuple[List[T], bool]:
+        """Collect the next batch, and whether stop was requested while collecting it"""
+        record = await self._queue.get()
+        if record is _STOP:
+            return [], True
+        batch = [record]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                record = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if record is _STOP:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    async def _write(self, batch: List[T]) -> None:
+        try:
+            await self.write(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Failed to write {len(batch)} {self.name} records: {str(e)}")
+
+    async def _run(self) -> None:
+        while True:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._write(batch)
+            if stopping:
+                return
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write everything still queued"""
+        if self._task is not None:
+            # Not cancelled: the task would drop the batch it is collecting.
+            # It writes what it holds and exits on reaching the sentinel
+            if not self._task.done():
+                await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        # Records submitted while stopping
+        while not self._queue.empty():
+            count = min(self.batch_size, self._queue.qsize())
+            batch = [record for record in (self._queue.get_nowait() for _ in range(count)) if record is not _STOP]
+            if batch:
+                await self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
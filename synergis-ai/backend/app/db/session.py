@@ -1,5 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
@@ -7,12 +9,43 @@ from app.core.config import settings
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=3600,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the sync URLs we accept
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url() -> str:
+    """Async URL from ASYNC_DATABASE_URL, or DATABASE_URL with an async driver."""
+    url = make_url(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+    if url.drivername == "postgresql+asyncpg":
+        url = url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DATABASE_STATEMENT_CACHE_SIZE)}
+        )
+    return url.render_as_string(hide_password=False)
+
+async_engine = create_async_engine(
+    get_async_database_url(),
+    pool_pre_ping=True,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 def get_db() -> Generator[Session, None, None]:
     """Dependency for getting database sessions."""
     db = SessionLocal()
@@ -21,6 +54,11 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting async database sessions."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db() -> None:
     """Initialize database with required tables."""
     from app.models.base import Base
@@ -28,4 +66,8 @@ def init_db() -> None:
 
 def close_db_connection() -> None:
     """Close database connection pool."""
-    engine.dispose()
\ No newline at end of file
+    engine.dispose()
+
+async def close_async_db_connection() -> None:
+    """Close async database connection pool."""
+    await async_engine.dispose()
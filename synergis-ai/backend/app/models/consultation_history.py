@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.models.base import Base
+
+class ConsultationSession(Base):
+    """A consultation conversation, identified by the session id handed to the client."""
+
+    __tablename__ = "consultation_sessions"
+
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class ConsultationMessage(Base):
+    """One user or assistant message of a consultation session."""
+
+    __tablename__ = "consultation_messages"
+    # History is read newest first per session, so pages are range scans of this index
+    __table_args__ = (Index("ix_consultation_messages_session_id_id", "session_id", "id"),)
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    session_id = Column(
+        String, ForeignKey("consultation_sessions.id", ondelete="CASCADE"), nullable=False
+    )
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
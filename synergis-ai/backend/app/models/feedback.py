@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.models.base import Base
+
+class Feedback(Base):
+    """A rating, and optional comment, left for a consultation session."""
+
+    __tablename__ = "consultation_feedback"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # No foreign key: feedback and history are written by separate batches,
+    # so feedback may land before its session row
+    session_id = Column(String, index=True, nullable=False)
+    rating = Column(Integer, nullable=False)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from app.models.base import Base
+
+class Interaction(Base):
+    """A user's interaction with a catalog item, the training signal for recommendations."""
+
+    __tablename__ = "interactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, index=True, nullable=False)
+    item_id = Column(String, index=True, nullable=False)
+    event_type = Column(String, nullable=False, default="view")
+    weight = Column(Float, nullable=False, default=1.0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import JSON, Boolean, Column, DateTime, Integer, String, Text
+
+from app.models.base import Base
+
+class Job(Base):
+    """A background maintenance job and its persisted progress."""
+
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    type = Column(String, index=True, nullable=False)
+    # queued, running, succeeded, failed or cancelled
+    status = Column(String, index=True, nullable=False, default="queued")
+    params = Column(JSON, nullable=True)
+    checkpoint = Column(JSON, nullable=True)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Refreshed while a worker runs the job; a stale heartbeat means it died
+    heartbeat_at = Column(DateTime, nullable=True)
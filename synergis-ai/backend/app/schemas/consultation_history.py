@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class ConsultationMessageBase(BaseModel):
+    session_id: str
+    role: str
+    content: str
+
+class ConsultationMessageCreate(ConsultationMessageBase):
+    created_at: Optional[datetime] = None
+
+class ConsultationMessage(ConsultationMessageBase):
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
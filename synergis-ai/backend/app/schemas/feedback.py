@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class FeedbackBase(BaseModel):
+    session_id: str
+    rating: int
+    comment: Optional[str] = None
+
+class FeedbackCreate(FeedbackBase):
+    created_at: Optional[datetime] = None
+
+class Feedback(FeedbackBase):
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
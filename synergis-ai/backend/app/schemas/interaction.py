@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class InteractionBase(BaseModel):
+    user_id: str
+    item_id: str
+    event_type: str = "view"
+    weight: float = 1.0
+
+class InteractionCreate(InteractionBase):
+    created_at: Optional[datetime] = None
+
+class Interaction(InteractionBase):
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+class JobBase(BaseModel):
+    type: str
+    params: Optional[Dict[str, Any]] = None
+
+class JobCreate(JobBase):
+    pass
+
+class Job(JobBase):
+    id: str
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
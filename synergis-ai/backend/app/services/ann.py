@@ -0,0 +1,155 @@
+import os
+from typing import List, Optional
+import numpy as np
+
+from .catalog import normalize_rows
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+    """Index of the most similar centroid for every row"""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignment[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 15,
+    sample_size: Optional[int] = 100_000,
+    seed: int = 0,
+) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit centroids"""
+    rng = np.random.default_rng(seed)
+    if sample_size and len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignment = _assign(vectors, centroids)
+
+        # Sum the members of each cluster with one sort instead of a Python loop
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_clusters)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[present])[:-1]))
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+
+        centroids[present] = normalize_rows(sums)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = vectors[rng.choice(len(vectors), empty.size, replace=False)]
+
+    return centroids
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over catalog rows.
+
+    Items are partitioned by their nearest k-means centroid; a query only
+    scores the items in its ``n_probe`` closest partitions, so latency grows
+    with ``n / n_lists * n_probe`` instead of ``n``. Raising ``n_probe``
+    trades latency for recall. Rows are the row numbers of the
+    ``CatalogIndex`` matrix and are kept in sync as items move.
+    """
+
+    def __init__(self, centroids: np.ndarray, n_probe: int = 8):
+        self.centroids = normalize_rows(centroids)
+        self.n_probe = n_probe
+        self._lists: List[np.ndarray] = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self._sizes = np.zeros(len(self.centroids), dtype=np.int64)
+        self._assignment = np.empty(0, dtype=np.int32)
+        self._position = np.empty(0, dtype=np.int64)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8, seed: int = 0) -> "IVFIndex":
+        """Learn centroids from vectors and index every row"""
+        n_lists = n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        index = cls(spherical_kmeans(vectors, n_lists, seed=seed), n_probe=n_probe)
+        index.build(vectors)
+        return index
+
+    def build(self, vectors: np.ndarray) -> None:
+        """Assign every row of vectors to its partition, replacing existing lists"""
+        assignment = _assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=self.n_lists)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        self._lists = [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(self.n_lists)]
+        self._sizes = counts.astype(np.int64)
+        self._assignment = assignment
+        self._position = np.empty(len(vectors), dtype=np.int64)
+        for rows in self._lists:
+            self._position[rows] = np.arange(len(rows))
+
+    def _ensure_rows(self, size: int) -> None:
+        if size <= len(self._assignment):
+            return
+        capacity = max(size, 2 * len(self._assignment))
+        self._assignment = np.resize(self._assignment, capacity)
+        self._position = np.resize(self._position, capacity)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Index new catalog rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return
+        self._ensure_rows(int(rows.max()) + 1)
+        for row, list_id in zip(rows, _assign(normalize_rows(vectors).reshape(len(rows), -1), self.centroids)):
+            rows_in_list = self._lists[list_id]
+            size = self._sizes[list_id]
+            if size == len(rows_in_list):
+                rows_in_list = np.resize(rows_in_list, max(8, 2 * size))
+                self._lists[list_id] = rows_in_list
+            rows_in_list[size] = row
+            self._sizes[list_id] = size + 1
+            self._assignment[row] = list_id
+            self._position[row] = size
+
+    def remove(self, row: int) -> None:
+        """Drop a catalog row from its partition"""
+        list_id = self._assignment[row]
+        position = self._position[row]
+        last = self._sizes[list_id] - 1
+        rows_in_list = self._lists[list_id]
+        moved = rows_in_list[last]
+        rows_in_list[position] = moved
+        self._position[moved] = position
+        self._sizes[list_id] = last
+
+    def move(self, old_row: int, new_row: int) -> None:
+        """Follow a catalog item whose row number changed"""
+        list_id = self._assignment[old_row]
+        position = self._position[old_row]
+        self._lists[list_id][position] = new_row
+        self._assignment[new_row] = list_id
+        self._position[new_row] = position
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Rows in the partitions closest to a unit-length query"""
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        similarity = self.centroids @ query
+        probes = np.argpartition(-similarity, n_probe - 1)[:n_probe]
+        return np.concatenate([self._lists[i][:self._sizes[i]] for i in probes])
+
+    def save(self, path: str) -> None:
+        """Persist the trained centroids"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, n_probe=self.n_probe)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, n_probe: Optional[int] = None) -> "IVFIndex":
+        """Load persisted centroids and index vectors without retraining"""
+        with np.load(path) as data:
+            index = cls(data["centroids"], n_probe=n_probe or int(data["n_probe"]))
+        index.build(vectors)
+        return index
@@ -0,0 +1,277 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row as float32, leaving all-zero rows untouched"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class CatalogIndex:
+    """Item embeddings held in one contiguous, pre-normalized float32 matrix.
+
+    Scoring the whole catalog is a single matrix-vector product followed
+    by an ``argpartition`` top-k, with category and price filters applied
+    as vectorized masks. Items can be added or removed at any time: the
+    matrix grows by doubling and removal moves the last row into the
+    freed slot, so no operation rebuilds the index.
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self.ann = None  # optional IVFIndex over the rows
+        capacity = max(1, initial_capacity)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._prices = np.full(capacity, np.nan, dtype=np.float32)
+        self._categories = np.full(capacity, -1, dtype=np.int32)
+        self._ids: List[str] = []
+        self._items: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._category_codes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the normalized item vectors, one row per item"""
+        return self._vectors[:len(self._ids)]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._ids
+
+    def snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Copy of the item ids and their vectors, taken together so rows stay aligned"""
+        with self._lock:
+            count = len(self._ids)
+            return list(self._ids), self._vectors[:count].copy()
+
+    def _ensure_capacity(self, size: int) -> None:
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        count = len(self._ids)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:count] = self._vectors[:count]
+        prices = np.full(capacity, np.nan, dtype=np.float32)
+        prices[:count] = self._prices[:count]
+        categories = np.full(capacity, -1, dtype=np.int32)
+        categories[:count] = self._categories[:count]
+        self._vectors, self._prices, self._categories = vectors, prices, categories
+
+    def _category_code(self, category: Optional[str]) -> int:
+        if category is None:
+            return -1
+        return self._category_codes.setdefault(category, len(self._category_codes))
+
+    def add(self, items: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Add or replace items; each item needs an "id" and may have "category" and "price" """
+        vectors = normalize_rows(vectors).reshape(len(items), self.dim)
+        with self._lock:
+            self._ensure_capacity(len(self._ids) + len(items))
+            indexed = len(self._ids)
+            changed: Dict[int, np.ndarray] = {}
+            for item, vector in zip(items, vectors):
+                item_id = str(item["id"])
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(item_id)
+                    self._items.append(item)
+                    self._rows[item_id] = row
+                else:
+                    self._items[row] = item
+                    if self.ann is not None and row < indexed and row not in changed:
+                        self.ann.remove(row)
+                self._vectors[row] = vector
+                price = item.get("price")
+                self._prices[row] = np.nan if price is None else price
+                self._categories[row] = self._category_code(item.get("category"))
+                changed[row] = vector
+
+            if self.ann is not None and changed:
+                self.ann.add(np.fromiter(changed, dtype=np.int64), np.stack(list(changed.values())))
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        """Remove items by id and return how many were present"""
+        removed = 0
+        with self._lock:
+            for item_id in item_ids:
+                row = self._rows.pop(str(item_id), None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if self.ann is not None:
+                    self.ann.remove(row)
+                    if row != last:
+                        self.ann.move(last, row)
+                if row != last:
+                    # Move the last item into the freed slot
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._prices[row] = self._prices[last]
+                    self._categories[row] = self._categories[last]
+                    self._ids[row] = moved_id
+                    self._items[row] = self._items[last]
+                    self._rows[moved_id] = row
+                self._ids.pop()
+                self._items.pop()
+                self._prices[last] = np.nan
+                self._categories[last] = -1
+                removed += 1
+        return removed
+
+    def save(
+        self,
+        store: Any,
+        vectors: Optional[np.ndarray] = None,
+        trained: Optional[Tuple[List[str], np.ndarray]] = None,
+    ) -> str:
+        """Publish the catalog as a new version of a VersionedVectorStore, optionally with new vectors.
+
+        ``trained`` is an (ids, vectors) pair replacing the vectors of those
+        items still in the catalog; it is merged under the same lock as the
+        publish, so items added or moved meanwhile keep their own rows.
+        """
+        with self._lock:
+            count = len(self._ids)
+            if trained is not None:
+                trained_ids, trained_vectors = trained
+                trained_rows = {item_id: row for row, item_id in enumerate(trained_ids)}
+                source = np.asarray([trained_rows.get(item_id, -1) for item_id in self._ids], dtype=np.int64)
+                keep = source >= 0
+                vectors = self._vectors[:count].copy()
+                vectors[keep] = trained_vectors[source[keep]]
+            return store.publish(
+                arrays={
+                    "vectors": self._vectors[:count] if vectors is None else normalize_rows(vectors),
+                    "prices": self._prices[:count],
+                    "categories": self._categories[:count],
+                },
+                documents={
+                    "ids": self._ids,
+                    "items": self._items,
+                    "category_codes": self._category_codes,
+                },
+                metadata={"kind": "catalog", "dim": self.dim, "count": count},
+            )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Any) -> "CatalogIndex":
+        """Open a published catalog, mapping its arrays instead of reading them.
+
+        The snapshot should be opened copy-on-write (``mode="c"``): pages are
+        shared with every other process serving the same version until this
+        index modifies them.
+        """
+        index = cls(dim=int(snapshot.metadata["dim"]), initial_capacity=1)
+        ids = snapshot.document("ids")
+        if ids:
+            index._vectors = snapshot.array("vectors")
+            index._prices = snapshot.array("prices")
+            index._categories = snapshot.array("categories")
+        index._ids = ids
+        index._items = snapshot.document("items")
+        index._rows = {item_id: row for row, item_id in enumerate(ids)}
+        index._category_codes = snapshot.document("category_codes")
+        return index
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        row = self._rows.get(item_id)
+        return None if row is None else self._items[row]
+
+    def vector(self, item_id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(item_id)
+        return None if row is None else self._vectors[row].copy()
+
+    def _filter_mask(
+        self,
+        rows: Any,
+        categories: Optional[List[str]],
+        min_price: Optional[float],
+        max_price: Optional[float],
+    ) -> Optional[np.ndarray]:
+        mask = None
+        if categories is not None:
+            codes = [self._category_codes[c] for c in categories if c in self._category_codes]
+            mask = np.isin(self._categories[rows], codes)
+        if min_price is not None:
+            # NaN prices compare False, so unpriced items are filtered out too
+            price_mask = self._prices[rows] >= min_price
+            mask = price_mask if mask is None else mask & price_mask
+        if max_price is not None:
+            price_mask = self._prices[rows] <= max_price
+            mask = price_mask if mask is None else mask & price_mask
+        return mask
+
+    def enable_ann(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        path: Optional[str] = None,
+    ) -> None:
+        """Serve searches from an IVF index, loading its centroids from path when present"""
+        from .ann import IVFIndex
+
+        with self._lock:
+            if path and os.path.exists(path):
+                self.ann = IVFIndex.load(path, self.vectors, n_probe=n_probe)
+            else:
+                self.ann = IVFIndex.train(self.vectors, n_lists=n_lists, n_probe=n_probe)
+                if path:
+                    self.ann.save(path)
+
+    def disable_ann(self) -> None:
+        with self._lock:
+            self.ann = None
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        categories: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        n_probe: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Get the k items most similar to query as (item, cosine similarity) pairs.
+
+        With an IVF index enabled only its ``n_probe`` closest partitions are
+        scored; ``exact=True`` forces a full scan.
+        """
+        query = normalize_rows(query)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or k <= 0:
+                return []
+
+            rows = None
+            if self.ann is not None and not exact:
+                rows = self.ann.candidates(query, n_probe)
+            selection = slice(0, count) if rows is None else rows
+
+            scores = self._vectors[selection] @ query
+            mask = self._filter_mask(selection, categories, min_price, max_price)
+            if mask is not None:
+                keep = np.flatnonzero(mask)
+                scores = scores[keep]
+                rows = keep if rows is None else rows[keep]
+            if scores.shape[0] == 0:
+                return []
+
+            k = min(k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            result_rows = top if rows is None else rows[top]
+            return [(self._items[row], float(score)) for row, score in zip(result_rows, scores[top])]
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.embeddings.base import Embeddings
+
+from app.core.config import settings
+
+class _DiskEmbeddingCache:
+    """SQLite-backed embedding cache shared by every worker process"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+            ).fetchall()
+        return {key: np.frombuffer(vector, dtype=np.float32) for key, vector in rows}
+
+    def put_many(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in items],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class EmbeddingService(Embeddings):
+    """Shared text embedding model with caching and request coalescing.
+
+    Embeddings are keyed by a hash of the model name and the text, kept in
+    an in-process LRU cache and, when ``cache_path`` is set, persisted to
+    disk. Concurrent async requests arriving within ``batch_window_ms``
+    are embedded together in one model call. Vectors are float32 arrays;
+    the LangChain ``Embeddings`` methods return lists so the service can
+    be handed to Chroma directly.
+    """
+
+    def __init__(
+        self,
+        model: Optional[Embeddings] = None,
+        cache_size: int = settings.EMBEDDING_CACHE_SIZE,
+        cache_path: Optional[str] = settings.EMBEDDING_CACHE_PATH,
+        batch_window_ms: int = settings.EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size: int = settings.EMBEDDING_BATCH_MAX_SIZE,
+    ):
+        self.model = model or HuggingFaceEmbeddings()
+        self.model_name = getattr(self.model, "model_name", type(self.model).__name__)
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _DiskEmbeddingCache(cache_path) if cache_path else None
+
+        # Async requests waiting for the next batched model call
+        self._queue: List[Tuple[str, str]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._batches = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def _get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+            return vector
+
+    def _put_memory(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.cache_size:
+                self._memory.popitem(last=False)
+
+    def _compute(self, keys: List[str], texts: List[str]) -> List[np.ndarray]:
+        """Resolve vectors from the disk tier or the model, in one call each"""
+        found = self._disk.get_many(keys) if self._disk else {}
+        self._disk_hits += len(found)
+
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        if missing:
+            computed = np.asarray(
+                self.model.embed_documents([texts[i] for i in missing]), dtype=np.float32
+            )
+            self._misses += len(missing)
+            self._batches += 1
+            new_items = [(keys[i], computed[row]) for row, i in enumerate(missing)]
+            found.update(new_items)
+            if self._disk:
+                self._disk.put_many(new_items)
+
+        for key in keys:
+            self._put_memory(key, found[key])
+        return [found[key] for key in keys]
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts synchronously, reusing cached vectors"""
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self._get_memory(key) for key in keys]
+
+        # Embed each distinct uncached text once
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing[key] = text
+        if missing:
+            resolved = dict(zip(missing, self._compute(list(missing), list(missing.values()))))
+            vectors = [resolved[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    async def aembed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, batching cache misses with other concurrent requests"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            key = self._key(text)
+            vector = self._get_memory(key)
+            if vector is not None:
+                future = loop.create_future()
+                future.set_result(vector)
+            else:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = loop.create_future()
+                    self._inflight[key] = future
+                    self._queue.append((key, text))
+                    self._schedule_flush(loop)
+            futures.append(future)
+
+        # Futures are shared between callers, one cancellation must not cancel the others
+        vectors = await asyncio.gather(*(asyncio.shield(future) for future in futures))
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    async def aembed(self, text: str) -> np.ndarray:
+        return (await self.aembed_many([text]))[0]
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if len(self._queue) >= self.max_batch_size:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_handle = None
+            loop.create_task(self._flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.batch_window, lambda: loop.create_task(self._flush())
+            )
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+        if self._queue:
+            self._schedule_flush(asyncio.get_running_loop())
+        if not batch:
+            return
+
+        keys = [key for key, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(self._compute, keys, [text for _, text in batch])
+        except Exception as e:
+            for key in keys:
+                future = self._inflight.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, vector in zip(keys, vectors):
+            future = self._inflight.pop(key)
+            if not future.done():
+                future.set_result(vector)
+
+    # LangChain Embeddings interface
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_many(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_many([text])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (await self.aembed_many(texts)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed(text)).tolist()
+
+    def close(self) -> None:
+        if self._disk:
+            self._disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "model_calls": self._batches,
+        }
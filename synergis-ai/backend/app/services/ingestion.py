@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+from langchain.vectorstores import Chroma
+from loguru import logger
+
+from app.services.embeddings import EmbeddingService
+from app.services.lexical import LexicalIndex
+
+Documents = Union[Iterable[Document], AsyncIterable[Document]]
+
+def content_hash(text: str) -> str:
+    """Chunk id in the knowledge base, insensitive to whitespace differences"""
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+async def _aiter(documents: Documents) -> AsyncIterator[Document]:
+    if hasattr(documents, "__aiter__"):
+        async for document in documents:
+            yield document
+    else:
+        for document in documents:
+            yield document
+            # Let requests run between documents of a synchronous source
+            await asyncio.sleep(0)
+
+def read_jsonl_documents(path: str, offset: int, limit: int) -> Tuple[List[Document], int]:
+    """Read up to limit {"page_content", "metadata"} lines from a byte offset, returning the next offset"""
+    documents = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while len(documents) < limit:
+            line = f.readline()
+            if not line:
+                break
+            offset = f.tell()
+            if line.strip():
+                record = json.loads(line)
+                documents.append(Document(page_content=record["page_content"], metadata=record.get("metadata") or {}))
+    return documents, offset
+
+class IngestionProgress:
+    """Counters of one ingestion run"""
+
+    def __init__(self):
+        self.documents = 0
+        self.chunks = 0
+        self.indexed = 0
+        self.duplicates = 0
+        self.batches = 0
+        self._started = time.perf_counter()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "indexed": self.indexed,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+        }
+
+class KnowledgeBaseIngestor:
+    """Streams documents into the Chroma knowledge base in fixed-size batches.
+
+    Documents are split as they are read. Each batch of chunks is then
+    deduplicated, embedded and committed on a small dedicated thread pool.
+    Chunks are stored under their content hash, so chunks already in the
+    collection are skipped before embedding and re-ingesting a corpus is
+    idempotent. At most ``workers`` batches are in flight, and the source
+    is not read further until one completes, so memory stays bounded by
+    ``batch_size * workers`` chunks whatever the corpus size. New chunks
+    are also added to the ``lexical`` keyword index when there is one.
+    """
+
+    def __init__(
+        self,
+        vectorstore: Chroma,
+        embeddings: EmbeddingService,
+        splitter: Optional[TextSplitter] = None,
+        batch_size: int = 64,
+        workers: int = 2,
+        lexical: Optional[LexicalIndex] = None,
+    ):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.lexical = lexical
+        self.splitter = splitter or RecursiveCharacterTextSplitter(add_start_index=True)
+        self.batch_size = batch_size
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kb-ingest")
+
+    def _new_chunks(self, chunks: List[Document]) -> List[Tuple[str, Document]]:
+        by_id: Dict[str, Document] = {}
+        for chunk in chunks:
+            by_id.setdefault(content_hash(chunk.page_content), chunk)
+        existing = set(self.vectorstore._collection.get(ids=list(by_id), include=[])["ids"])
+        return [(chunk_id, chunk) for chunk_id, chunk in by_id.items() if chunk_id not in existing]
+
+    def _index_batch(self, chunks: List[Document]) -> Tuple[int, int]:
+        """Embed and commit the chunks not indexed yet, returning (indexed, duplicates)"""
+        fresh = self._new_chunks(chunks)
+        if fresh:
+            texts = [chunk.page_content for _, chunk in fresh]
+            # Straight to the model: bulk ingestion would otherwise evict the
+            # query embeddings that serving relies on from the shared caches
+            vectors = self.embeddings.model.embed_documents(texts)
+            # Upsert, so a chunk raced in by a concurrent batch is not an error
+            self.vectorstore._collection.upsert(
+                ids=[chunk_id for chunk_id, _ in fresh],
+                embeddings=vectors,
+                documents=texts,
+                metadatas=[chunk.metadata or None for _, chunk in fresh],
+            )
+            if self.lexical is not None:
+                self.lexical.add([chunk_id for chunk_id, _ in fresh], texts)
+        return len(fresh), len(chunks) - len(fresh)
+
+    def _persist(self) -> None:
+        persist = getattr(self.vectorstore, "persist", None)
+        if persist is not None:
+            persist()
+
+    async def ingest(
+        self,
+        documents: Documents,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+    ) -> IngestionProgress:
+        """Split, deduplicate, embed and index a stream of documents"""
+        loop = asyncio.get_running_loop()
+        progress = IngestionProgress()
+        pending: Set[asyncio.Future] = set()
+
+        def record(done: Set[asyncio.Future]) -> None:
+            for future in done:
+                pending.discard(future)
+                indexed, duplicates = future.result()
+                progress.indexed += indexed
+                progress.duplicates += duplicates
+                progress.batches += 1
+                if on_progress is not None:
+                    on_progress(progress)
+
+        async def submit(batch: List[Document]) -> None:
+            # Backpressure: wait for a free worker before reading more input
+            while len(pending) >= self.workers:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                record(done)
+            pending.add(loop.run_in_executor(self._executor, self._index_batch, batch))
+
+        try:
+            batch: List[Document] = []
+            async for document in _aiter(documents):
+                progress.documents += 1
+                for chunk in self.splitter.split_documents([document]):
+                    batch.append(chunk)
+                    progress.chunks += 1
+                    if len(batch) >= self.batch_size:
+                        await submit(batch)
+                        batch = []
+            if batch:
+                await submit(batch)
+            if pending:
+                done, _ = await asyncio.wait(pending)
+                record(done)
+        finally:
+            # Never leave batches writing behind an aborted run
+            if pending:
+                await asyncio.wait(pending)
+
+        await loop.run_in_executor(self._executor, self._persist)
+        logger.info(
+            f"Ingested {progress.documents} documents: {progress.indexed} chunks indexed, "
+            f"{progress.duplicates} duplicates skipped in {progress.elapsed_seconds:.1f}s"
+        )
+        return progress
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
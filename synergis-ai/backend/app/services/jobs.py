@@ -0,0 +1,194 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from app.crud.job import job as job_crud
+from app.models.job import Job
+from app.schemas.job import JobCreate
+
+class JobContext:
+    """What a running job handler sees: its parameters, last checkpoint and progress"""
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self.id = job.id
+        self.type = job.type
+        self.params: Dict[str, Any] = job.params or {}
+        # Set when resuming an interrupted run
+        self.checkpoint: Optional[Dict[str, Any]] = job.checkpoint
+        self.progress: Dict[str, Any] = dict(job.progress or {})
+        self._manager = manager
+
+    def report(self, **progress: Any) -> None:
+        """Update the job's progress; it is persisted with the next heartbeat"""
+        self.progress.update(progress)
+
+    async def save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        """Persist resumable state; an interrupted job restarts with it as ``checkpoint``"""
+        self.checkpoint = checkpoint
+        await self._manager._heartbeat(self, checkpoint=checkpoint)
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+class JobManager:
+    """In-process runner for long maintenance jobs with state kept in SQL.
+
+    Submitting only inserts a queued row. A poll loop claims queued jobs up
+    to each type's concurrency limit and runs them as tasks, outside any
+    request. Running jobs heartbeat their progress; a job whose worker died
+    goes stale and is claimed again, resuming from its last checkpoint, and
+    jobs interrupted by shutdown are handed back to the queue the same way.
+    Cancellation is a flag in the row, so any worker process can cancel a
+    job running in another.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        concurrency: Optional[Dict[str, int]] = None,
+        poll_seconds: float = 2.0,
+        heartbeat_seconds: float = 10.0,
+        stale_seconds: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = dict(concurrency or {})
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        self._running: Dict[str, Tuple[asyncio.Task, JobContext]] = {}
+        self._active: Dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: Optional[int] = None) -> None:
+        self._handlers[job_type] = handler
+        self.concurrency[job_type] = concurrency or self.concurrency.get(job_type, 1)
+        self._active.setdefault(job_type, 0)
+
+    async def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        async with self.session_factory() as db:
+            job = await job_crud.acreate(db, obj_in=JobCreate(type=job_type, params=params))
+        self._wake.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        async with self.session_factory() as db:
+            return await job_crud.aget(db, job_id)
+
+    async def list(self, job_type: Optional[str] = None, limit: int = 50) -> List[Job]:
+        async with self.session_factory() as db:
+            return await job_crud.aget_recent(db, type=job_type, limit=limit)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        async with self.session_factory() as db:
+            job = await job_crud.arequest_cancel(db, id=job_id)
+        running = self._running.get(job_id)
+        if running is not None:
+            running[0].cancel()
+        return job
+
+    async def _heartbeat(self, context: JobContext, **kwargs: Any) -> None:
+        async with self.session_factory() as db:
+            cancel_requested = await job_crud.aheartbeat(db, id=context.id, progress=context.progress, **kwargs)
+        running = self._running.get(context.id)
+        if cancel_requested and running is not None:
+            # Cancelled from another worker process
+            running[0].cancel()
+
+    async def _heartbeat_loop(self, context: JobContext) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self._heartbeat(context)
+            except Exception as e:
+                logger.warning(f"Failed to record heartbeat of job {context.id}: {str(e)}")
+
+    async def _run(self, context: JobContext) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat_loop(context))
+        status, result, error = "succeeded", None, None
+        try:
+            result = await self._handlers[context.type](context)
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            # Interrupted by shutdown: queue it again to resume from its checkpoint
+            status = "queued" if self._stopping else "cancelled"
+            if not self._stopping:
+                self.cancelled += 1
+        except Exception as e:
+            status, error = "failed", str(e)
+            self.failed += 1
+            logger.warning(f"Job {context.id} ({context.type}) failed: {error}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(context.id, None)
+            self._active[context.type] -= 1
+            self._wake.set()
+
+        try:
+            async with self.session_factory() as db:
+                await job_crud.afinish(
+                    db, id=context.id, status=status, progress=context.progress, result=result, error=error
+                )
+        except Exception as e:
+            # The heartbeat goes stale and the job is resumed elsewhere
+            logger.warning(f"Failed to record outcome of job {context.id}: {str(e)}")
+
+    async def _claim(self) -> None:
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        async with self.session_factory() as db:
+            for job_type in self._handlers:
+                free = self.concurrency[job_type] - self._active[job_type]
+                if free <= 0:
+                    continue
+                for job in await job_crud.aclaim(db, type=job_type, stale_before=stale_before, limit=free):
+                    context = JobContext(self, job)
+                    self._active[job_type] += 1
+                    self._running[job.id] = (asyncio.create_task(self._run(context)), context)
+                    logger.info(f"Started job {job.id} ({job_type}), attempt {job.attempts}")
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self._claim()
+            except Exception as e:
+                logger.warning(f"Failed to claim jobs: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and interrupt running ones, which are requeued"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        tasks = [task for task, _ in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            **{f"running_{job_type}": count for job_type, count in self._active.items()},
+        }
@@ -0,0 +1,127 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, List, Optional, Tuple
+
+# Same token characters as the FTS5 tokenizer below, so "AB-1234" stays one term
+_TERM = re.compile(r"[^\W_][\w\-]*")
+
+# Function words that match nearly every chunk and carry no topic
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+def query_terms(text: str) -> List[str]:
+    """Distinct lowercased terms of a query, in order"""
+    return list(dict.fromkeys(term.lower() for term in _TERM.findall(text)))
+
+class LexicalIndex:
+    """BM25 keyword search over knowledge base chunks.
+
+    Chunks live in a SQLite FTS5 inverted index next to the Chroma
+    collection, under the same chunk ids, so a file is shared by every
+    worker process and exact terms such as product names and SKUs are
+    found without an embedding pass. Stop words and terms found in more
+    than ``max_df`` of the chunks are left out of queries, and a match
+    must contain at least ``min_match`` of the remaining terms and score
+    at least ``min_score`` when it is set.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_df: float = 0.5,
+        min_match: float = 0.5,
+        min_score: Optional[float] = None,
+    ):
+        self.max_df = max_df
+        self.min_match = min_match
+        self.min_score = min_score
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunk_ids (id TEXT PRIMARY KEY)")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks "
+            "USING fts5(id UNINDEXED, content, tokenize=\"unicode61 tokenchars '-_'\")"
+        )
+        # Per-term document counts of the index above
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks, row)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunk_ids").fetchone()[0]
+
+    def add(self, ids: List[str], texts: List[str]) -> int:
+        """Index chunks not indexed yet and return how many were added"""
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for chunk_id, text in zip(ids, texts):
+                    cursor = self._conn.execute("INSERT OR IGNORE INTO chunk_ids (id) VALUES (?)", (chunk_id,))
+                    if cursor.rowcount:
+                        self._conn.execute("INSERT INTO chunks (id, content) VALUES (?, ?)", (chunk_id, text))
+                        added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def backfill(self, collection: Any, page_size: int = 1000) -> int:
+        """Index the chunks of a Chroma collection that are missing here"""
+        total = collection.count()
+        if len(self) >= total:
+            return 0
+        added = 0
+        for offset in range(0, total, page_size):
+            page = collection.get(limit=page_size, offset=offset, include=["documents"])
+            added += self.add(page["ids"], page["documents"])
+        return added
+
+    def _selective_terms(self, terms: List[str]) -> List[str]:
+        """Drop the terms too common in the index to tell chunks apart"""
+        placeholders = ", ".join("?" * len(terms))
+        total = self._conn.execute("SELECT count(*) FROM chunk_ids").fetchone()[0]
+        counts = dict(self._conn.execute(
+            f"SELECT term, doc FROM chunks_vocab WHERE term IN ({placeholders})", terms
+        ).fetchall())
+        return [term for term in terms if counts.get(term, 0) <= self.max_df * total]
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[str, float]]:
+        """Get (chunk id, BM25 score) of the best matches for the query terms, best first"""
+        terms = [term for term in query_terms(query) if term not in STOP_WORDS]
+        if not terms or k <= 0:
+            return []
+        with self._lock:
+            terms = self._selective_terms(terms)
+            if not terms:
+                return []
+            match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            rows = self._conn.execute(
+                # FTS5 bm25() is lower for better matches
+                "SELECT id, content, -bm25(chunks) FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+                (match, k),
+            ).fetchall()
+        needed = self.min_match * len(terms)
+        return [
+            (chunk_id, float(score))
+            for chunk_id, content, score in rows
+            if (self.min_score is None or score >= self.min_score)
+            and len(set(terms).intersection(query_terms(content))) >= needed
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
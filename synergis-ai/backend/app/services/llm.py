@@ -1,47 +1,424 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.llms import GPT4All
-from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.llms.base import LLM, BaseLLM
 from langchain.vectorstores import Chroma
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from langchain.chains import ConversationalRetrievalChain, LLMChain
+from langchain.memory.prompt import SUMMARY_PROMPT
 from langchain.prompts import PromptTemplate
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, get_buffer_string
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from loguru import logger
+import asyncio
+import itertools
+import math
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.services.embeddings import EmbeddingService
+from app.services.ingestion import Documents, IngestionProgress, KnowledgeBaseIngestor
+from app.services.lexical import LexicalIndex
+from app.services.memory import SessionMemoryStore
+from app.services.reranker import CrossEncoderReranker
+from app.services.retrieval import ContextPacker, KnowledgeBaseRetriever, KnowledgeBaseSearch
+from app.services.response_cache import (
+    InMemoryResponseCacheBackend,
+    RedisResponseCacheBackend,
+    ResponseCache,
+)
+
 # Load environment variables
 load_dotenv()
 
+CHROMA_PERSIST_DIRECTORY = ".chroma"
+KB_VERSION_FILE = os.path.join(CHROMA_PERSIST_DIRECTORY, "kb_version")
+LEXICAL_INDEX_FILE = os.path.join(CHROMA_PERSIST_DIRECTORY, "lexical.sqlite3")
+
+# Tag marking the chain that generates the final answer, so streaming skips
+# the tokens of the question-condensing step
+ANSWER_TAG = "consultation_answer"
+
+class _AnswerTokenHandler(BaseCallbackHandler):
+    """Forward tokens of the answer-generating LLM call to an asyncio queue"""
+
+    run_inline = True
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self._loop = loop
+        self._queue = queue
+        self._answer_runs = set()
+
+    def _track(self, run_id: UUID, parent_run_id: Optional[UUID], tags: Optional[List[str]]) -> None:
+        if ANSWER_TAG in (tags or []) or parent_run_id in self._answer_runs:
+            self._answer_runs.add(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, **kwargs) -> None:
+        self._track(run_id, parent_run_id, tags)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, **kwargs) -> None:
+        self._track(run_id, parent_run_id, tags)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs) -> None:
+        # GPT4All generates in a worker thread, hand tokens over thread-safely
+        if run_id in self._answer_runs:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, token)
+
+T = TypeVar("T")
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+class InferenceOverloadedError(Exception):
+    """Raised when the inference queue cannot accept or serve a request in time"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _BatchItem:
+    def __init__(self, prompt: str, stop: Optional[List[str]]):
+        self.prompt = prompt
+        self.stop = stop
+        self.result: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+class MicroBatcher:
+    """Collect prompts arriving within a short window and generate them together.
+
+    The first caller of a batch waits up to ``window_seconds`` (or until
+    ``max_batch_size`` prompts are pending) and then submits every pending
+    prompt to the backend in a single ``generate`` call. Backends with
+    batched decoding process the whole batch in one forward pass per
+    token; others fall back to generating the prompts one after another.
+    The backend is a single model instance that is not thread-safe, so
+    batches are generated one at a time.
+    """
+
+    def __init__(self, backend: BaseLLM, window_seconds: float = 0.01, max_batch_size: int = 8):
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._cond = threading.Condition()
+        self._backend_lock = threading.Lock()
+        self._open: List[_BatchItem] = []
+        self._batches = 0
+        self._prompts = 0
+
+    def generate(self, prompt: str, stop: Optional[List[str]] = None) -> str:
+        """Generate a completion for prompt as part of the next batch"""
+        item = _BatchItem(prompt, stop)
+        with self._cond:
+            batch = self._open
+            batch.append(item)
+            leader = len(batch) == 1
+            if len(batch) >= self.max_batch_size:
+                # Close the full batch, later arrivals start a new one
+                self._open = []
+                self._cond.notify_all()
+
+            if leader:
+                deadline = time.monotonic() + self.window_seconds
+                while batch is self._open:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if batch is self._open:
+                    self._open = []
+
+        if leader:
+            self._run(batch)
+
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self, batch: List[_BatchItem]) -> None:
+        # Prompts can only share a generate call when they share stop words
+        groups: Dict[Any, List[_BatchItem]] = {}
+        for item in batch:
+            groups.setdefault(tuple(item.stop or ()), []).append(item)
+
+        for stop, items in groups.items():
+            try:
+                with self._backend_lock:
+                    result = self.backend.generate(
+                        [item.prompt for item in items], stop=list(stop) or None
+                    )
+                for item, generations in zip(items, result.generations):
+                    item.result = generations[0].text
+            except Exception as e:
+                for item in items:
+                    item.error = e
+            finally:
+                for item in items:
+                    item.done.set()
+
+        self._batches += 1
+        self._prompts += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self._batches,
+            "avg_batch_size": round(self._prompts / self._batches, 2) if self._batches else 0.0,
+        }
+
+class BatchedLLM(LLM):
+    """LangChain LLM that routes every prompt through a shared MicroBatcher"""
+
+    batcher: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "micro_batched"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        text = self.batcher.generate(prompt, stop)
+        # Batched generation cannot stream per request, emit the text at once
+        if run_manager:
+            run_manager.on_llm_new_token(text)
+        return text
+
+class ModelWorker:
+    """A model instance together with the chains bound to it"""
+
+    def __init__(self, llm: BaseLLM, chain: ConversationalRetrievalChain, summary_chain: LLMChain):
+        self.llm = llm
+        self.chain = chain
+        self.summary_chain = summary_chain
+
+class _InferenceJob:
+    def __init__(self, fn: Callable[[ModelWorker], Any], future: asyncio.Future):
+        self.fn = fn
+        self.future = future
+        self.started = asyncio.Event()
+        self.enqueued_at = time.monotonic()
+
+class InferenceScheduler:
+    """Bounded pool of model workers fed from a priority queue.
+
+    Each worker owns its own model instance and runs one generation at a
+    time on a dedicated thread, so the CPU is never oversubscribed by
+    concurrent requests. Requests are rejected with a retry hint when the
+    queue is full or when they wait longer than ``max_wait_seconds`` for a
+    worker.
+    """
+
+    def __init__(self, workers: List[ModelWorker], max_queue_size: int = 32, max_wait_seconds: float = 30.0):
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=len(workers), thread_name_prefix="llm-worker")
+        self._sequence = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._busy = 0
+        self._avg_service_seconds = 5.0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def start(self) -> None:
+        """Start one consumer task per model worker"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(worker)) for worker in self.workers]
+
+    async def stop(self) -> None:
+        """Stop the consumer tasks and release the worker threads"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def retry_after(self) -> int:
+        """Estimate in seconds until a newly queued request would be served"""
+        backlog = (self._queue.qsize() + self._busy) / len(self.workers)
+        return max(1, math.ceil(backlog * self._avg_service_seconds))
+
+    def ensure_capacity(self) -> None:
+        """Raise if a new request would be rejected right now"""
+        if self._queue.full():
+            self._rejected += 1
+            raise InferenceOverloadedError("Inference queue is full", self.retry_after())
+
+    async def submit(self, fn: Callable[[ModelWorker], T], priority: int = PRIORITY_INTERACTIVE) -> T:
+        """Run fn on the next free model worker and return its result"""
+        self.ensure_capacity()
+        job = _InferenceJob(fn, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait((priority, next(self._sequence), job))
+
+        try:
+            await asyncio.wait_for(job.started.wait(), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            job.future.cancel()
+            self._timed_out += 1
+            raise InferenceOverloadedError("Timed out waiting for a model worker", self.retry_after())
+        except asyncio.CancelledError:
+            # The worker skips jobs whose caller went away
+            job.future.cancel()
+            raise
+
+        return await job.future
+
+    async def _run(self, worker: ModelWorker) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job.future.cancelled():
+                    continue
+
+                job.started.set()
+                self._busy += 1
+                started = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(self._executor, job.fn, worker)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    self._busy -= 1
+                    self._completed += 1
+                    elapsed = time.monotonic() - started
+                    self._avg_service_seconds += 0.2 * (elapsed - self._avg_service_seconds)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "busy_workers": self._busy,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.max_queue_size,
+            "avg_service_seconds": round(self._avg_service_seconds, 3),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
 class LLMService:
-    def __init__(self):
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
         self.model_path = os.getenv("MODEL_PATH")
         self.model_type = os.getenv("MODEL_TYPE", "gpt4all")
         
-        # Initialize the language model
-        self.llm = self._initialize_llm()
+        # Initialize one language model per inference worker, or a single
+        # backend shared through the micro-batcher
+        self.batcher: Optional[MicroBatcher] = None
+        if settings.LLM_BATCH_ENABLED:
+            self.batcher = MicroBatcher(
+                self._initialize_llm(
+                    n_threads=settings.LLM_THREADS_PER_WORKER or os.cpu_count() or 1
+                ),
+                window_seconds=settings.LLM_BATCH_WINDOW_MS / 1000,
+                max_batch_size=settings.LLM_BATCH_MAX_SIZE,
+            )
+            # Enough scheduler workers in flight to fill a batch
+            self.llms = [
+                BatchedLLM(batcher=self.batcher)
+                for _ in range(max(settings.LLM_WORKERS, settings.LLM_BATCH_MAX_SIZE))
+            ]
+        else:
+            self.llms = [self._initialize_llm() for _ in range(settings.LLM_WORKERS)]
+        self.llm = self.llms[0]
         
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings()
+        # Initialize embeddings, shared with other services when provided
+        self.embeddings = embedding_service or EmbeddingService()
         
         # Initialize vector store
         self.vectorstore = self._initialize_vectorstore()
+        self._kb_version = 0
+        self._kb_version_mtime: Optional[int] = None
+        # Keyword index maintained alongside the vector store
+        self.lexical_index = LexicalIndex(
+            LEXICAL_INDEX_FILE,
+            max_df=settings.RETRIEVAL_LEXICAL_MAX_DF,
+            min_match=settings.RETRIEVAL_LEXICAL_MIN_MATCH,
+            min_score=settings.RETRIEVAL_LEXICAL_MIN_SCORE,
+        ) if settings.RETRIEVAL_HYBRID else None
+        self.ingestor = KnowledgeBaseIngestor(
+            self.vectorstore,
+            self.embeddings,
+            splitter=RecursiveCharacterTextSplitter(
+                chunk_size=settings.KB_CHUNK_SIZE,
+                chunk_overlap=settings.KB_CHUNK_OVERLAP,
+                add_start_index=True,
+            ),
+            batch_size=settings.KB_INGEST_BATCH_SIZE,
+            workers=settings.KB_INGEST_WORKERS,
+            lexical=self.lexical_index,
+        )
+        self.retrieval = KnowledgeBaseSearch(
+            self.vectorstore,
+            self.embeddings,
+            kb_version=lambda: self.kb_version,
+            k=settings.RETRIEVAL_K,
+            search_type=settings.RETRIEVAL_SEARCH_TYPE,
+            fetch_k=settings.RETRIEVAL_FETCH_K,
+            lambda_mult=settings.RETRIEVAL_MMR_LAMBDA,
+            score_threshold=settings.RETRIEVAL_SCORE_THRESHOLD,
+            # Leave the rest of n_ctx for the history, question and answer
+            packer=ContextPacker(settings.RETRIEVAL_MAX_CONTEXT_TOKENS, token_counter=self.llm.get_num_tokens),
+            reranker=self._initialize_reranker(),
+            rerank_candidates=settings.RETRIEVAL_RERANK_CANDIDATES,
+            lexical=self.lexical_index,
+            lexical_k=settings.RETRIEVAL_LEXICAL_K,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+            keyword_max_terms=settings.RETRIEVAL_KEYWORD_MAX_TERMS,
+            cache_size=settings.RETRIEVAL_CACHE_SIZE,
+        )
         
-        # Initialize conversation memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
+        # Initialize the semantic response cache
+        self.response_cache = self._initialize_response_cache()
+        
+        # Initialize per-session conversation memory
+        self.memory_store = SessionMemoryStore(
+            token_counter=self.llm.get_num_tokens,
+            max_token_limit=settings.MEMORY_MAX_TOKENS,
+            max_sessions=settings.MEMORY_MAX_SESSIONS,
+            ttl_seconds=settings.MEMORY_SESSION_TTL_SECONDS,
         )
+        self._background_tasks = set()
         
-        # Initialize the conversation chain
-        self.chain = self._initialize_chain()
+        # Initialize the conversation chains and the scheduler feeding them
+        self.workers = [
+            ModelWorker(
+                llm=llm,
+                chain=self._initialize_chain(llm),
+                summary_chain=LLMChain(llm=llm, prompt=SUMMARY_PROMPT),
+            )
+            for llm in self.llms
+        ]
+        self.chain = self.workers[0].chain
+        self.scheduler = InferenceScheduler(
+            self.workers,
+            max_queue_size=settings.LLM_QUEUE_MAX_SIZE,
+            max_wait_seconds=settings.LLM_QUEUE_MAX_WAIT_SECONDS,
+        )
 
-    def _initialize_llm(self) -> GPT4All:
+    def _initialize_llm(self, n_threads: Optional[int] = None) -> GPT4All:
         """Initialize the language model"""
         try:
+            # Split the CPUs between workers unless tuned explicitly
+            n_threads = n_threads or settings.LLM_THREADS_PER_WORKER or max(
+                1, (os.cpu_count() or 1) // settings.LLM_WORKERS
+            )
             return GPT4All(
                 model=self.model_path,
                 verbose=True,
                 n_ctx=2048,  # Context window
-                n_threads=8,  # Number of CPU threads to use
+                n_threads=n_threads,  # Number of CPU threads per worker
                 temp=0.7,    # Temperature for response generation
             )
         except Exception as e:
@@ -53,12 +430,71 @@ class LLMService:
             return Chroma(
                 collection_name="synergis_kb",
                 embedding_function=self.embeddings,
-                persist_directory=".chroma"
+                persist_directory=CHROMA_PERSIST_DIRECTORY
             )
         except Exception as e:
             raise Exception(f"Failed to initialize vector store: {str(e)}")
 
-    def _initialize_chain(self) -> ConversationalRetrievalChain:
+    def _initialize_reranker(self) -> Optional[CrossEncoderReranker]:
+        """Initialize the optional cross-encoder reranker"""
+        if not settings.RETRIEVAL_RERANK_MODEL:
+            return None
+        try:
+            return CrossEncoderReranker(
+                settings.RETRIEVAL_RERANK_MODEL,
+                top_n=settings.RETRIEVAL_RERANK_TOP_N,
+                batch_size=settings.RETRIEVAL_RERANK_BATCH_SIZE,
+                min_score=settings.RETRIEVAL_RERANK_MIN_SCORE,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to initialize reranker: {str(e)}")
+
+    def _initialize_response_cache(self) -> Optional[ResponseCache]:
+        """Initialize the semantic response cache"""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        try:
+            backend_class = (
+                RedisResponseCacheBackend
+                if settings.RESPONSE_CACHE_BACKEND == "redis"
+                else InMemoryResponseCacheBackend
+            )
+            return ResponseCache(
+                backend_class(
+                    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+                ),
+                embed=self.embeddings.aembed,
+                similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to initialize response cache: {str(e)}")
+
+    @property
+    def kb_version(self) -> int:
+        """Version of the knowledge base, bumped on every update"""
+        # Re-read only when another worker process bumped the file
+        try:
+            mtime = os.stat(KB_VERSION_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return self._kb_version
+        if mtime != self._kb_version_mtime:
+            with open(KB_VERSION_FILE) as f:
+                self._kb_version = int(f.read().strip() or 0)
+            self._kb_version_mtime = mtime
+        return self._kb_version
+
+    def _bump_kb_version(self) -> int:
+        version = self.kb_version + 1
+        os.makedirs(CHROMA_PERSIST_DIRECTORY, exist_ok=True)
+        tmp_path = f"{KB_VERSION_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, KB_VERSION_FILE)
+        self._kb_version = version
+        return version
+
+    def _initialize_chain(self, llm: BaseLLM) -> ConversationalRetrievalChain:
         """Initialize the conversation chain"""
         try:
             # Custom prompt template for consultation
@@ -82,47 +518,207 @@ class LLMService:
             )
 
             return ConversationalRetrievalChain.from_llm(
-                llm=self.llm,
-                retriever=self.vectorstore.as_retriever(),
-                memory=self.memory,
-                combine_docs_chain_kwargs={"prompt": PROMPT}
+                llm=llm,
+                retriever=KnowledgeBaseRetriever(search=self.retrieval),
+                combine_docs_chain_kwargs={"prompt": PROMPT, "tags": [ANSWER_TAG]}
             )
         except Exception as e:
             raise Exception(f"Failed to initialize conversation chain: {str(e)}")
 
-    async def process_message(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+    def _build_inputs(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build the chain inputs from the session history and extra context"""
+        chat_history: List[BaseMessage] = []
+        if session_id:
+            chat_history = self.memory_store.load_messages(session_id)
+
+        # Add any additional context to the conversation
+        if context:
+            context_turn = ("System: Additional context provided", str(context))
+            chat_history.append(HumanMessage(content=context_turn[0]))
+            chat_history.append(AIMessage(content=context_turn[1]))
+            if session_id:
+                self._remember(session_id, *context_turn)
+
+        return {"question": message, "chat_history": chat_history}
+
+    def _remember(self, session_id: str, human: str, ai: str) -> None:
+        """Save a turn and fold trimmed turns into the rolling summary"""
+        if self.memory_store.save_turn(session_id, human, ai):
+            task = asyncio.create_task(self._summarize(session_id))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _summarize(self, session_id: str) -> None:
+        """Fold turns evicted from the buffer into the session summary"""
+        while True:
+            claimed = self.memory_store.begin_summary(session_id)
+            if claimed is None:
+                return
+            summary, turns = claimed
+            new_lines = get_buffer_string([
+                message
+                for human, ai in turns
+                for message in (HumanMessage(content=human), AIMessage(content=ai))
+            ])
+            try:
+                new_summary = await self.scheduler.submit(
+                    lambda worker: worker.summary_chain.predict(
+                        summary=summary, new_lines=new_lines
+                    ),
+                    priority=PRIORITY_BACKGROUND,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to summarize session {session_id}: {str(e)}")
+                # Keep the turns for a retry after the session's next turn
+                self.memory_store.abort_summary(session_id, turns)
+                return
+            self.memory_store.end_summary(session_id, new_summary)
+
+    async def process_message(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> str:
         """Process a message and return the AI response"""
         try:
-            # Add any additional context to the conversation
-            if context:
-                self.memory.save_context(
-                    {"input": "System: Additional context provided"},
-                    {"output": str(context)}
-                )
+            inputs = self._build_inputs(message, context, session_id)
 
-            # Get response from the chain
-            response = await self.chain.arun(message)
+            # Only questions without history are cacheable, history changes the answer
+            cacheable = self.response_cache is not None and not inputs["chat_history"]
+            if cacheable:
+                kb_version = self.kb_version
+                cached, embedding = await self.response_cache.lookup(message, kb_version)
+                if cached is not None:
+                    if session_id:
+                        self._remember(session_id, message, cached)
+                    return cached
+
+            # Get response from the chain on the next free model worker
+            result = await self.scheduler.submit(lambda worker: worker.chain(inputs))
+            response = result["answer"]
+
+            if cacheable:
+                await self.response_cache.store(message, response, embedding, kb_version)
+            if session_id:
+                self._remember(session_id, message, response)
 
             return response
 
+        except InferenceOverloadedError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to process message: {str(e)}")
 
-    async def update_knowledge_base(self, documents: list):
-        """Update the knowledge base with new documents"""
+    async def stream_message(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Process a message and yield the AI response token by token"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        handler = _AnswerTokenHandler(loop, queue)
+        inputs = self._build_inputs(message, context, session_id)
+
+        cacheable = self.response_cache is not None and not inputs["chat_history"]
+        if cacheable:
+            kb_version = self.kb_version
+            cached, embedding = await self.response_cache.lookup(message, kb_version)
+            if cached is not None:
+                yield cached
+                if session_id:
+                    self._remember(session_id, message, cached)
+                return
+
+        task = asyncio.create_task(self.scheduler.submit(
+            lambda worker: worker.chain(inputs, callbacks=[handler])
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                token = await queue.get()
+                if token is None:
+                    break
+                yield token
+
+            response = task.result()["answer"]
+            if cacheable:
+                await self.response_cache.store(message, response, embedding, kb_version)
+            if session_id:
+                self._remember(session_id, message, response)
+
+        except InferenceOverloadedError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to stream message: {str(e)}")
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def update_knowledge_base(
+        self,
+        documents: Documents,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+    ):
+        """Update the knowledge base with new documents.
+
+        ``documents`` may be a list, or a sync or async iterator streaming a
+        large corpus; it is chunked, deduplicated and indexed incrementally.
+        """
         try:
-            # Add documents to the vector store
-            self.vectorstore.add_documents(documents)
-            self.vectorstore.persist()
-            return {"status": "success", "message": "Knowledge base updated successfully"}
+            progress = await self.ingestor.ingest(documents, on_progress=on_progress)
+
+            # Invalidate answers cached against the previous knowledge base
+            if progress.indexed:
+                self._bump_kb_version()
+            return {
+                "status": "success",
+                "message": "Knowledge base updated successfully",
+                "ingestion": progress.to_dict(),
+            }
         except Exception as e:
             raise Exception(f"Failed to update knowledge base: {str(e)}")
 
+    def warmup(self) -> None:
+        """Run a dummy inference so the model and embeddings are fully loaded"""
+        try:
+            self.embeddings.embed_query("warmup")
+            if self.lexical_index is not None:
+                # Index chunks ingested before the keyword index existed
+                added = self.lexical_index.backfill(self.vectorstore._collection)
+                if added:
+                    logger.info(f"Backfilled {added} chunks into the keyword index")
+            # Batched workers share one backend, warming one warms them all
+            for llm in self.llms[:1] if self.batcher else self.llms:
+                llm("Hello", stop=["\n"])
+        except Exception as e:
+            raise Exception(f"Failed to warm up LLM: {str(e)}")
+
+    def start(self) -> None:
+        """Start serving inference requests"""
+        self.scheduler.start()
+
+    async def stop(self) -> None:
+        """Stop the inference workers"""
+        await self.scheduler.stop()
+        self.ingestor.close()
+        if self.lexical_index is not None:
+            self.lexical_index.close()
+
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model configuration"""
         return {
             "model_type": self.model_type,
             "model_path": self.model_path,
             "context_window": 2048,
+            "inference": self.scheduler.stats(),
+            "batching": self.batcher.stats() if self.batcher else None,
             "embedding_model": "sentence-transformers",
         }
\ No newline at end of file
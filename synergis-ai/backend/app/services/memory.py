@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+Turn = Tuple[str, str]
+
+class SessionMemory:
+    """Conversation state of a single consultation session"""
+
+    def __init__(self):
+        self.summary = ""
+        self.turns: List[Tuple[str, str, int]] = []  # (human, ai, tokens)
+        self.tokens = 0
+        self.pending: List[Turn] = []  # turns waiting to be folded into the summary
+        self.summarizing = False
+        self.last_access = time.monotonic()
+
+class SessionMemoryStore:
+    """Session-keyed conversation memory with a bounded token budget.
+
+    Every session keeps its most recent turns verbatim up to
+    ``max_token_limit`` tokens; older turns are handed back to the caller
+    to be folded into a rolling summary. Idle sessions are evicted in LRU
+    order once they exceed ``ttl_seconds`` or the store holds more than
+    ``max_sessions`` sessions.
+    """
+
+    def __init__(
+        self,
+        token_counter: Callable[[str], int],
+        max_token_limit: int = 1000,
+        max_sessions: int = 1000,
+        ttl_seconds: int = 3600,
+    ):
+        self.token_counter = token_counter
+        self.max_token_limit = max_token_limit
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _get(self, session_id: str, create: bool = False) -> Optional[SessionMemory]:
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            if not create:
+                return None
+            memory = SessionMemory()
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+
+        memory.last_access = now
+        return memory
+
+    def _evict_expired(self, now: float) -> None:
+        # Sessions are kept in access order, so expired ones sit at the front
+        while self._sessions:
+            memory = next(iter(self._sessions.values()))
+            if now - memory.last_access < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+    def load_messages(self, session_id: str) -> List[BaseMessage]:
+        """Get the chat history to feed into the prompt for a session"""
+        with self._lock:
+            memory = self._get(session_id)
+            if memory is None:
+                return []
+
+            messages: List[BaseMessage] = []
+            if memory.summary:
+                messages.append(SystemMessage(content=memory.summary))
+            for human, ai, _ in memory.turns:
+                messages.append(HumanMessage(content=human))
+                messages.append(AIMessage(content=ai))
+            return messages
+
+    def get_history(self, session_id: str) -> Optional[Tuple[str, List[Turn]]]:
+        """Get the rolling summary and retained turns of a session"""
+        with self._lock:
+            memory = self._get(session_id)
+            if memory is None:
+                return None
+            return memory.summary, [(human, ai) for human, ai, _ in memory.turns]
+
+    def save_turn(self, session_id: str, human: str, ai: str) -> bool:
+        """Record a turn and trim the buffer to the token budget.
+
+        Returns True when trimmed turns are waiting to be summarized and no
+        summarization is already running for the session.
+        """
+        tokens = self.token_counter(human) + self.token_counter(ai)
+        with self._lock:
+            memory = self._get(session_id, create=True)
+            memory.turns.append((human, ai, tokens))
+            memory.tokens += tokens
+
+            # Always keep the latest turn, even if it alone exceeds the budget
+            while memory.tokens > self.max_token_limit and len(memory.turns) > 1:
+                old_human, old_ai, old_tokens = memory.turns.pop(0)
+                memory.tokens -= old_tokens
+                memory.pending.append((old_human, old_ai))
+
+            return bool(memory.pending) and not memory.summarizing
+
+    def begin_summary(self, session_id: str) -> Optional[Tuple[str, List[Turn]]]:
+        """Claim the pending turns of a session for summarization"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None or memory.summarizing or not memory.pending:
+                return None
+            pending, memory.pending = memory.pending, []
+            memory.summarizing = True
+            return memory.summary, pending
+
+    def end_summary(self, session_id: str, summary: Optional[str]) -> None:
+        """Store the new rolling summary; None keeps the previous one"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                return
+            if summary is not None:
+                memory.summary = summary.strip()
+            memory.summarizing = False
+
+    def abort_summary(self, session_id: str, turns: List[Turn]) -> None:
+        """Return claimed turns to the front of the pending queue after a failed summarization"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                return
+            memory.pending[:0] = turns
+            memory.summarizing = False
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple, TypeVar
+from loguru import logger
+
+from app.db.batch_writer import BatchWriter
+from app.models.recommendation import Recommendation
+from app.schemas.consultation_history import ConsultationMessageCreate
+from app.services.llm import LLMService
+from app.services.recommendation import RecommendationService
+
+T = TypeVar("T")
+
+class StageTimings:
+    """Wall-clock duration of each stage of one consultation turn"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    async def measure(self, stage: str, awaitable: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.stages[stage] = time.perf_counter() - started
+
+    def finish(self) -> None:
+        self.stages["total"] = time.perf_counter() - self._started
+
+    def server_timing(self) -> str:
+        """Value for a ``Server-Timing`` response header"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+    def to_dict(self) -> Dict[str, float]:
+        return {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+
+class ConsultationPipeline:
+    """Runs a consultation turn with recommendation work off the critical path.
+
+    Embedding the user input and shortlisting catalog candidates start at
+    the same time as generation, which also warms the embedding cache for
+    the retriever's query. Once the response arrives only the response
+    embedding and a re-rank of the shortlist remain; if recommending fails
+    the response is returned without recommendations. Finished turns are
+    handed to the ``history`` writer, which persists them in the background.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        recommendation_service: RecommendationService,
+        history: Optional[BatchWriter[ConsultationMessageCreate]] = None,
+    ):
+        self.llm = llm_service
+        self.recommendation = recommendation_service
+        self.history = history
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._turns = 0
+
+    def _prepare(self, message: str, user_id: Optional[str], timings: StageTimings) -> asyncio.Task:
+        return asyncio.create_task(timings.measure(
+            "prescore", self.recommendation.prepare_recommendations(message, user_id=user_id)
+        ))
+
+    async def _rerank(self, prepare: asyncio.Task, response: str, timings: StageTimings) -> List[Recommendation]:
+        try:
+            # Usually done long before generation finishes
+            candidates = await timings.measure("prescore_wait", prepare)
+            return await timings.measure(
+                "rerank", self.recommendation.rerank_recommendations(candidates, response)
+            )
+        except Exception as e:
+            # The response is already generated and saved, answer without recommendations
+            logger.warning(f"Failed to get recommendations: {str(e)}")
+            return []
+
+    def _persist(self, session_id: Optional[str], message: str, response: str, asked_at: datetime) -> None:
+        if self.history is None or not session_id:
+            return
+        self.history.submit(ConsultationMessageCreate(
+            session_id=session_id, role="user", content=message, created_at=asked_at
+        ))
+        self.history.submit(ConsultationMessageCreate(
+            session_id=session_id, role="assistant", content=response, created_at=datetime.utcnow()
+        ))
+
+    def _record(self, timings: StageTimings) -> None:
+        timings.finish()
+        self._turns += 1
+        for stage, seconds in timings.stages.items():
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    async def run(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[str, List[Recommendation], StageTimings]:
+        """Generate the response and recommendations for one message"""
+        asked_at = datetime.utcnow()
+        timings = StageTimings()
+        prepare = self._prepare(message, user_id, timings)
+        try:
+            response = await timings.measure("generate", self.llm.process_message(
+                message, context=context, session_id=session_id
+            ))
+        except BaseException:
+            prepare.cancel()
+            raise
+
+        self._persist(session_id, message, response, asked_at)
+        recommendations = await self._rerank(prepare, response, timings)
+        self._record(timings)
+        return response, recommendations, timings
+
+    async def stream(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("token", text) pairs, then ("recommendations", list) and ("timings", dict)"""
+        asked_at = datetime.utcnow()
+        timings = StageTimings()
+        prepare = self._prepare(message, user_id, timings)
+        try:
+            tokens = []
+            started = time.perf_counter()
+            async for token in self.llm.stream_message(message, context=context, session_id=session_id):
+                if not tokens:
+                    timings.stages["first_token"] = time.perf_counter() - started
+                tokens.append(token)
+                yield "token", token
+            timings.stages["generate"] = time.perf_counter() - started
+        except BaseException:
+            prepare.cancel()
+            raise
+
+        response = "".join(tokens)
+        self._persist(session_id, message, response, asked_at)
+        yield "recommendations", await self._rerank(prepare, response, timings)
+        self._record(timings)
+        yield "timings", timings.to_dict()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": self._turns,
+            **{
+                f"avg_{stage}_seconds": round(total / self._counts[stage], 6)
+                for stage, total in self._totals.items()
+            },
+        }
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+import numpy as np
+from loguru import logger
+
+class UserPreferenceModel:
+    """Per-user preference vector kept as an exponential moving average.
+
+    Each interaction moves the user's vector towards the embedding of what
+    they interacted with (or away from it for negative weights), at O(d)
+    cost. Updated vectors are buffered and written to the underlying
+    user vector store in batches: callers flush once ``flush_due`` reports
+    ``batch_size`` pending users, and a background task flushes every
+    ``flush_seconds``. Vectors being written stay visible to reads and
+    updates until the write completes.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        decay: float = 0.1,
+        batch_size: int = 256,
+        flush_seconds: float = 5.0,
+    ):
+        self.store = store
+        self.decay = decay
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[str, np.ndarray] = {}
+        # Taken out of _pending by a flush whose write has not completed yet
+        self._flushing: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.updates = 0
+        self.flushes = 0
+
+    def _buffered(self, user_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._pending.get(user_id)
+            return vector if vector is not None else self._flushing.get(user_id)
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        vector = self._buffered(user_id)
+        return vector.copy() if vector is not None else self.store.get(user_id)
+
+    def update(self, user_id: str, embedding: np.ndarray, weight: float = 1.0) -> Optional[np.ndarray]:
+        """Fold one interaction into the user's vector and return the new vector"""
+        if weight == 0:
+            # Carries no preference either way
+            return self.get(user_id)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        target = np.sign(weight) * embedding / norm if norm else embedding
+        # A weight of n counts as n consecutive interactions
+        alpha = 1.0 - (1.0 - self.decay) ** abs(weight)
+
+        current = self._buffered(user_id)
+        if current is None:
+            current = self.store.get(user_id)
+        vector = target if current is None or not current.any() else (1.0 - alpha) * current + alpha * target
+        vector = vector.astype(np.float32)
+
+        with self._lock:
+            self._pending[user_id] = vector
+            self.updates += 1
+        return vector
+
+    @property
+    def flush_due(self) -> bool:
+        return len(self._pending) >= self.batch_size
+
+    def flush(self) -> int:
+        """Write pending vectors to the store in one batch, returns how many"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+            try:
+                self.store.put_many(list(pending), np.stack(list(pending.values())))
+            except Exception:
+                # Keep the updates for the next attempt unless newer ones replaced them
+                with self._lock:
+                    for user_id, vector in pending.items():
+                        self._pending.setdefault(user_id, vector)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+            self.flushes += 1
+            return len(pending)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Failed to flush user preferences: {str(e)}")
+
+    def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self.store),
+            "pending": len(self._pending),
+            "updates": self.updates,
+            "flushes": self.flushes,
+        }
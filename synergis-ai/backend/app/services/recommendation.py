@@ -1,15 +1,86 @@
-from typing import List, Dict, Any, Optional
-from recbole.quick_start import load_data_and_model
+import asyncio
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
+from ..core.config import settings
 from ..models.recommendation import Recommendation
+from .catalog import CatalogIndex, normalize_rows
+from .embeddings import EmbeddingService
+from .preferences import UserPreferenceModel
+from .training import MatrixFactorizationTrainer, train_from_database
+from .vector_store import InMemoryUserVectorStore, UserVectorStore, VersionedVectorStore
+
+# Catalog served until real items are loaded through add_items
+DEFAULT_CATALOG = [
+    {
+        "id": "1",
+        "name": "Professional Consultation Package",
+        "description": "One-hour consultation with our expert team",
+        "price": 199.99,
+        "category": "Services",
+        "metadata": {
+            "duration": "1 hour",
+            "format": "video call"
+        }
+    },
+    {
+        "id": "2",
+        "name": "Business Strategy Workshop",
+        "description": "Interactive workshop for business growth",
+        "price": 499.99,
+        "category": "Workshop",
+        "metadata": {
+            "duration": "4 hours",
+            "participants": "up to 10"
+        }
+    },
+    {
+        "id": "3",
+        "name": "Monthly Mentorship Program",
+        "description": "Ongoing support and guidance",
+        "price": 299.99,
+        "category": "Subscription",
+        "metadata": {
+            "duration": "1 month",
+            "sessions": 4
+        }
+    },
+]
+
+class RecommendationCandidates:
+    """Catalog shortlist computed from the user input, re-ranked once the AI response arrives"""
+
+    def __init__(
+        self,
+        input_features: np.ndarray,
+        user_vector: Optional[np.ndarray],
+        items: List[Dict[str, Any]],
+        vectors: Optional[np.ndarray],
+    ):
+        self.input_features = input_features
+        self.user_vector = user_vector
+        self.items = items
+        self.vectors = vectors
 
 class RecommendationService:
-    def __init__(self):
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
+        # Initialize embeddings, shared with other services when provided
+        self.embeddings = embedding_service or EmbeddingService()
+
         # Initialize recommendation model
         self.model = self._initialize_model()
-        self.item_embeddings = {}
-        self.user_preferences = {}
+        self.catalog: Optional[CatalogIndex] = None
+        self.preferences: Optional[UserPreferenceModel] = None
+
+        # Catalog versions and user vectors persisted as memory maps shared by all workers
+        store_path = settings.RECOMMENDATION_STORE_PATH
+        self.catalog_store = VersionedVectorStore(os.path.join(store_path, "catalog")) if store_path else None
+        self.catalog_version: Optional[str] = None
+        self.user_vectors: Optional[UserVectorStore] = None
+        self._catalog_checked_at = 0.0
 
     def _initialize_model(self):
         """Initialize the recommendation model"""
@@ -21,16 +92,109 @@ class RecommendationService:
         except Exception as e:
             raise Exception(f"Failed to initialize recommendation model: {str(e)}")
 
-    def _extract_features(self, text: str) -> np.ndarray:
-        """Extract features from text for recommendation"""
+    async def _extract_features(self, texts: List[str]) -> np.ndarray:
+        """Extract features from texts for recommendation, one row per text"""
         try:
-            # TODO: Implement feature extraction
-            # This should convert text into a vector representation
-            return np.zeros(768)  # Placeholder vector
+            return await self.embeddings.aembed_many(texts)
 
         except Exception as e:
             raise Exception(f"Failed to extract features: {str(e)}")
 
+    def warmup(self) -> None:
+        """Run a dummy feature extraction so lazy initialisation happens at startup"""
+        try:
+            dim = self.embeddings.embed_many(["warmup"]).shape[1]
+            if self.user_vectors is None:
+                self.user_vectors = UserVectorStore(
+                    os.path.join(settings.RECOMMENDATION_STORE_PATH, "users"), dim
+                ) if settings.RECOMMENDATION_STORE_PATH else InMemoryUserVectorStore(dim)
+                self.preferences = UserPreferenceModel(
+                    self.user_vectors,
+                    decay=settings.RECOMMENDATION_PREFERENCE_DECAY,
+                    batch_size=settings.RECOMMENDATION_PREFERENCE_BATCH_SIZE,
+                    flush_seconds=settings.RECOMMENDATION_PREFERENCE_FLUSH_SECONDS,
+                )
+            if self.catalog is None and not self.reload_catalog():
+                self._index_items(
+                    DEFAULT_CATALOG,
+                    self.embeddings.embed_many([self._item_text(item) for item in DEFAULT_CATALOG])
+                )
+        except Exception as e:
+            raise Exception(f"Failed to warm up recommendation model: {str(e)}")
+
+    def _item_text(self, item: Dict[str, Any]) -> str:
+        return f"{item['name']}. {item.get('description', '')}"
+
+    def _index_items(self, items: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        if self.catalog is None:
+            self.catalog = CatalogIndex(dim=vectors.shape[1], initial_capacity=len(items))
+        self.catalog.add(items, vectors)
+        self._maybe_enable_ann(self.catalog)
+
+    def _maybe_enable_ann(self, catalog: CatalogIndex) -> None:
+        # Switch to approximate search once the catalog is large enough for it to pay off
+        if (
+            settings.RECOMMENDATION_INDEX == "ivf"
+            and catalog.ann is None
+            and len(catalog) >= settings.RECOMMENDATION_ANN_MIN_ITEMS
+        ):
+            catalog.enable_ann(
+                n_lists=settings.RECOMMENDATION_ANN_LISTS,
+                n_probe=settings.RECOMMENDATION_ANN_PROBES,
+                path=settings.RECOMMENDATION_ANN_INDEX_PATH,
+            )
+
+    def reload_catalog(self) -> bool:
+        """Swap in the current published catalog version if it changed, returns whether it did"""
+        try:
+            self._catalog_checked_at = time.monotonic()
+            if self.catalog_store is None:
+                return False
+            version = self.catalog_store.current_version()
+            if version is None or version == self.catalog_version:
+                return False
+
+            # Copy-on-write maps share pages with other workers until modified locally
+            catalog = CatalogIndex.from_snapshot(self.catalog_store.open(version, mode="c"))
+            self._maybe_enable_ann(catalog)
+            self.catalog, self.catalog_version = catalog, version
+            return True
+
+        except Exception as e:
+            raise Exception(f"Failed to reload catalog: {str(e)}")
+
+    def save_catalog(self) -> Optional[str]:
+        """Publish the catalog so other workers and restarts pick it up"""
+        try:
+            if self.catalog_store is None or self.catalog is None:
+                return None
+            self.catalog_version = self.catalog.save(self.catalog_store)
+            return self.catalog_version
+
+        except Exception as e:
+            raise Exception(f"Failed to save catalog: {str(e)}")
+
+    async def _refresh_catalog(self) -> None:
+        # Pick up versions published by training or another worker, at most once per interval
+        if time.monotonic() - self._catalog_checked_at >= settings.RECOMMENDATION_RELOAD_INTERVAL_SECONDS:
+            await asyncio.to_thread(self.reload_catalog)
+
+    async def add_items(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add or update catalog items without rebuilding the index; save_catalog publishes them"""
+        try:
+            vectors = await self._extract_features([self._item_text(item) for item in items])
+            # Indexing may train the IVF index, keep it off the event loop
+            await asyncio.to_thread(self._index_items, items, vectors)
+            return {"status": "success", "items": len(self.catalog)}
+
+        except Exception as e:
+            raise Exception(f"Failed to add catalog items: {str(e)}")
+
+    def remove_items(self, item_ids: List[str]) -> Dict[str, Any]:
+        """Remove items from the catalog"""
+        removed = self.catalog.remove(item_ids) if self.catalog else 0
+        return {"status": "success", "removed": removed}
+
     def _calculate_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors"""
         try:
@@ -40,81 +204,166 @@ class RecommendationService:
         except Exception as e:
             raise Exception(f"Failed to calculate similarity: {str(e)}")
 
+    def _personalize(self, features: np.ndarray, user_vector: Optional[np.ndarray]) -> np.ndarray:
+        # Pull the query towards what the user engaged with before
+        if user_vector is None:
+            return features
+        weight = settings.RECOMMENDATION_PREFERENCE_WEIGHT
+        return (1 - weight) * features / np.linalg.norm(features) + weight * user_vector
+
+    def _to_recommendations(self, matches: List[Tuple[Dict[str, Any], float]]) -> List[Recommendation]:
+        return [
+            Recommendation(
+                id=item["id"],
+                name=item["name"],
+                description=item.get("description", ""),
+                confidence=max(0.0, score),
+                price=item.get("price"),
+                category=item.get("category"),
+                metadata=item.get("metadata", {})
+            )
+            for item, score in matches
+        ]
+
     async def get_recommendations(
         self,
         user_input: str,
         ai_response: str,
         user_id: Optional[str] = None,
-        n_recommendations: int = 3
+        n_recommendations: int = 3,
+        categories: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
     ) -> List[Recommendation]:
         """Get product/service recommendations based on conversation"""
         try:
-            # Extract features from the conversation
-            input_features = self._extract_features(user_input)
-            response_features = self._extract_features(ai_response)
+            # Extract features from the conversation in a single pass
+            input_features, response_features = await self._extract_features(
+                [user_input, ai_response]
+            )
             
             # Combine features
             conversation_features = (input_features + response_features) / 2
+            user_vector = self.preferences.get(user_id) if user_id and self.preferences else None
+            conversation_features = self._personalize(conversation_features, user_vector)
 
-            # TODO: Replace with actual recommendation logic
-            # For now, return placeholder recommendations
-            sample_recommendations = [
-                Recommendation(
-                    id="1",
-                    name="Professional Consultation Package",
-                    description="One-hour consultation with our expert team",
-                    confidence=0.95,
-                    price=199.99,
-                    category="Services",
-                    metadata={
-                        "duration": "1 hour",
-                        "format": "video call"
-                    }
-                ),
-                Recommendation(
-                    id="2",
-                    name="Business Strategy Workshop",
-                    description="Interactive workshop for business growth",
-                    confidence=0.85,
-                    price=499.99,
-                    category="Workshop",
-                    metadata={
-                        "duration": "4 hours",
-                        "participants": "up to 10"
-                    }
-                ),
-                Recommendation(
-                    id="3",
-                    name="Monthly Mentorship Program",
-                    description="Ongoing support and guidance",
-                    confidence=0.75,
-                    price=299.99,
-                    category="Subscription",
-                    metadata={
-                        "duration": "1 month",
-                        "sessions": 4
-                    }
-                )
-            ]
+            await self._refresh_catalog()
+            if self.catalog is None:
+                return []
 
-            return sample_recommendations[:n_recommendations]
+            # Score the whole catalog in one pass
+            matches = self.catalog.search(
+                conversation_features,
+                k=n_recommendations,
+                categories=categories,
+                min_price=min_price,
+                max_price=max_price,
+            )
+            return self._to_recommendations(matches)
 
         except Exception as e:
             raise Exception(f"Failed to get recommendations: {str(e)}")
 
+    async def prepare_recommendations(
+        self,
+        user_input: str,
+        user_id: Optional[str] = None,
+        n_candidates: int = settings.RECOMMENDATION_CANDIDATES,
+        categories: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> RecommendationCandidates:
+        """Shortlist catalog items from the user input alone, before the AI response exists"""
+        try:
+            input_features = (await self._extract_features([user_input]))[0]
+            user_vector = self.preferences.get(user_id) if user_id and self.preferences else None
+
+            await self._refresh_catalog()
+            if self.catalog is None:
+                return RecommendationCandidates(input_features, user_vector, [], None)
+
+            matches = self.catalog.search(
+                self._personalize(input_features, user_vector),
+                k=n_candidates,
+                categories=categories,
+                min_price=min_price,
+                max_price=max_price,
+            )
+            items, vectors = [], []
+            for item, _ in matches:
+                vector = self.catalog.vector(str(item["id"]))
+                if vector is not None:
+                    items.append(item)
+                    vectors.append(vector)
+            return RecommendationCandidates(
+                input_features, user_vector, items, np.stack(vectors) if vectors else None
+            )
+
+        except Exception as e:
+            raise Exception(f"Failed to prepare recommendations: {str(e)}")
+
+    async def rerank_recommendations(
+        self,
+        candidates: RecommendationCandidates,
+        ai_response: str,
+        n_recommendations: int = 3
+    ) -> List[Recommendation]:
+        """Score the shortlisted candidates against the full conversation"""
+        try:
+            if candidates.vectors is None:
+                return []
+
+            response_features = (await self._extract_features([ai_response]))[0]
+            query = self._personalize(
+                (candidates.input_features + response_features) / 2, candidates.user_vector
+            )
+            scores = candidates.vectors @ normalize_rows(query)
+            top = np.argsort(-scores)[:n_recommendations]
+            return self._to_recommendations([(candidates.items[i], float(scores[i])) for i in top])
+
+        except Exception as e:
+            raise Exception(f"Failed to rerank recommendations: {str(e)}")
+
+    def start(self) -> None:
+        if self.preferences is not None:
+            self.preferences.start()
+
+    async def stop(self) -> None:
+        if self.preferences is not None:
+            await self.preferences.stop()
+
+    def close(self) -> None:
+        if self.user_vectors is not None:
+            self.user_vectors.close()
+            self.user_vectors = None
+
     async def update_user_preferences(
         self,
         user_id: str,
         interaction: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Update user preferences based on interactions"""
+        """Update user preferences based on interactions.
+
+        The interaction is embedded from its catalog ``item_id`` or, failing
+        that, its ``text``; ``weight`` scales its influence and a negative
+        weight moves the preferences away from it.
+        """
         try:
-            # TODO: Implement user preference updating
-            self.user_preferences[user_id] = {
-                "last_interaction": datetime.now(),
-                **interaction
-            }
-            
+            if self.preferences is None:
+                raise Exception("recommendation service is not warmed up")
+
+            item_id = interaction.get("item_id")
+            embedding = self.catalog.vector(str(item_id)) if item_id is not None and self.catalog else None
+            if embedding is None:
+                text = interaction.get("text")
+                if not text:
+                    raise Exception("interaction needs a known item_id or text")
+                embedding = await self.embeddings.aembed(text)
+
+            self.preferences.update(user_id, embedding, float(interaction.get("weight", 1.0)))
+            if self.preferences.flush_due:
+                await asyncio.to_thread(self.preferences.flush)
+
             return {
                 "status": "success",
                 "message": "User preferences updated successfully"
@@ -123,19 +372,55 @@ class RecommendationService:
         except Exception as e:
             raise Exception(f"Failed to update user preferences: {str(e)}")
 
-    async def train_model(self, training_data: List[Dict[str, Any]]):
-        """Train or update the recommendation model"""
+    async def train_model(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Train or update the recommendation model from stored interactions.
+
+        Cancelling the caller stops the training thread too: it is asked to
+        stop and awaited, so nothing is published after cancellation returns.
+        """
         try:
-            # TODO: Implement model training
+            if self.catalog is None or self.catalog_store is None or self.user_vectors is None:
+                raise Exception("training requires a loaded catalog and RECOMMENDATION_STORE_PATH")
+
+            trainer = MatrixFactorizationTrainer(
+                epochs=settings.RECOMMENDATION_TRAIN_EPOCHS,
+                batch_size=settings.RECOMMENDATION_TRAIN_BATCH_SIZE,
+                learning_rate=settings.RECOMMENDATION_TRAIN_LEARNING_RATE,
+                regularization=settings.RECOMMENDATION_TRAIN_REGULARIZATION,
+                workers=settings.RECOMMENDATION_TRAIN_WORKERS,
+            )
+            stop = threading.Event()
+            training = asyncio.ensure_future(asyncio.to_thread(
+                train_from_database,
+                self.catalog,
+                self.catalog_store,
+                self.user_vectors,
+                trainer,
+                settings.RECOMMENDATION_TRAIN_CHUNK_SIZE,
+                since,
+                should_stop=stop.is_set,
+            ))
+            try:
+                metrics = await asyncio.shield(training)
+            except asyncio.CancelledError:
+                # Cancelling the await leaves the thread running, stop it first
+                stop.set()
+                while not training.done():
+                    try:
+                        await asyncio.shield(training)
+                    except asyncio.CancelledError:
+                        continue
+                    except Exception:
+                        break
+                raise
+            # Serve the newly published item vectors right away
+            await asyncio.to_thread(self.reload_catalog)
+
             return {
                 "status": "success",
                 "message": "Model trained successfully",
-                "metrics": {
-                    "accuracy": 0.85,
-                    "precision": 0.82,
-                    "recall": 0.79
-                }
+                "metrics": metrics
             }
 
         except Exception as e:
-            raise Exception(f"Failed to train model: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to train model: {str(e)}")
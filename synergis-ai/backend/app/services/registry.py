@@ -0,0 +1,253 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, status
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import register_collector
+from app.crud.consultation_history import consultation_message
+from app.crud.feedback import feedback as feedback_crud
+from app.crud.interaction import interaction as interaction_crud
+from app.db.batch_writer import BatchWriter
+from app.db.session import AsyncSessionLocal
+from app.schemas.consultation_history import ConsultationMessageCreate
+from app.schemas.feedback import FeedbackCreate
+from app.schemas.interaction import InteractionCreate
+from app.services.embeddings import EmbeddingService
+from app.services.ingestion import read_jsonl_documents
+from app.services.jobs import JobContext, JobManager
+from app.services.llm import LLMService
+from app.services.pipeline import ConsultationPipeline
+from app.services.recommendation import RecommendationService
+
+async def _write_history(messages: List[ConsultationMessageCreate]) -> None:
+    async with AsyncSessionLocal() as db:
+        await consultation_message.aappend(db, messages=messages)
+
+async def _write_feedback(feedback: List[FeedbackCreate]) -> None:
+    async with AsyncSessionLocal() as db:
+        await feedback_crud.abulk_create(db, objs_in=feedback)
+
+async def _write_interactions(interactions: List[InteractionCreate]) -> None:
+    async with AsyncSessionLocal() as db:
+        await interaction_crud.abulk_create(db, objs_in=interactions)
+
+class ServiceRegistry:
+    """Process-wide holder for the heavyweight AI services.
+
+    The services are built once from the application lifespan hook and
+    shared by every request, so model weights, embeddings and the vector
+    store client are only loaded a single time per worker process.
+    """
+
+    def __init__(self):
+        self.embeddings: Optional[EmbeddingService] = None
+        self.llm: Optional[LLMService] = None
+        self.recommendation: Optional[RecommendationService] = None
+        self.consultation: Optional[ConsultationPipeline] = None
+        self.history: Optional[BatchWriter[ConsultationMessageCreate]] = None
+        self.feedback: Optional[BatchWriter[FeedbackCreate]] = None
+        self.interactions: Optional[BatchWriter[InteractionCreate]] = None
+        self.jobs: Optional[JobManager] = None
+        self.ready = False
+
+    async def startup(self) -> None:
+        """Build the services and warm them up before reporting ready"""
+        started = time.perf_counter()
+
+        # Feedback does not need the models, accept it while they load
+        self.feedback = BatchWriter(
+            "feedback",
+            _write_feedback,
+            batch_size=settings.FEEDBACK_BATCH_SIZE,
+            flush_seconds=settings.FEEDBACK_FLUSH_SECONDS,
+            max_queue=settings.FEEDBACK_MAX_QUEUE,
+        )
+        self.feedback.start()
+        register_collector("feedback", self.feedback.stats)
+        # Interactions are the training data of the recommendation model
+        self.interactions = BatchWriter(
+            "interactions",
+            _write_interactions,
+            batch_size=settings.INTERACTION_BATCH_SIZE,
+            flush_seconds=settings.INTERACTION_FLUSH_SECONDS,
+            max_queue=settings.INTERACTION_MAX_QUEUE,
+        )
+        self.interactions.start()
+        register_collector("interactions", self.interactions.stats)
+
+        # Model loading is blocking, keep it off the event loop
+        self.embeddings = await asyncio.to_thread(EmbeddingService)
+        self.llm = await asyncio.to_thread(LLMService, self.embeddings)
+        self.recommendation = await asyncio.to_thread(RecommendationService, self.embeddings)
+
+        # Run a dummy inference so the first real request does not pay for
+        # lazy initialisation inside the model backends
+        await asyncio.to_thread(self.llm.warmup)
+        await asyncio.to_thread(self.recommendation.warmup)
+        self.llm.start()
+        self.recommendation.start()
+        if settings.CONSULTATION_HISTORY_ENABLED:
+            self.history = BatchWriter(
+                "consultation_history",
+                _write_history,
+                batch_size=settings.CONSULTATION_HISTORY_BATCH_SIZE,
+                flush_seconds=settings.CONSULTATION_HISTORY_FLUSH_SECONDS,
+                max_queue=settings.CONSULTATION_HISTORY_MAX_QUEUE,
+            )
+            self.history.start()
+            register_collector("consultation_history", self.history.stats)
+        self.consultation = ConsultationPipeline(self.llm, self.recommendation, history=self.history)
+
+        register_collector("embeddings", self.embeddings.stats)
+        register_collector("inference", self.llm.scheduler.stats)
+        register_collector("retrieval", self.llm.retrieval.stats)
+        if self.llm.retrieval.reranker is not None:
+            register_collector("reranker", self.llm.retrieval.reranker.stats)
+        register_collector("consultation", self.consultation.stats)
+        if self.recommendation.preferences is not None:
+            register_collector("user_preferences", self.recommendation.preferences.stats)
+        if self.llm.response_cache is not None:
+            register_collector("response_cache", self.llm.response_cache.stats)
+
+        # Maintenance work runs here rather than in the requests that ask for it
+        self.jobs = JobManager(
+            AsyncSessionLocal,
+            concurrency=settings.JOB_CONCURRENCY,
+            poll_seconds=settings.JOB_POLL_SECONDS,
+            heartbeat_seconds=settings.JOB_HEARTBEAT_SECONDS,
+            stale_seconds=settings.JOB_STALE_SECONDS,
+        )
+        self.jobs.register("knowledge_base", self._knowledge_base_job)
+        self.jobs.register("recommendation_training", self._recommendation_training_job)
+        self.jobs.start()
+        register_collector("jobs", self.jobs.stats)
+
+        self.ready = True
+        logger.info(f"AI services ready in {time.perf_counter() - started:.1f}s")
+
+    async def _knowledge_base_job(self, context: JobContext) -> Dict[str, Any]:
+        """Index the JSON-lines file params["source"] under KB_SOURCE_DIRECTORY a slice at a time"""
+        root = os.path.realpath(settings.KB_SOURCE_DIRECTORY)
+        path = os.path.realpath(os.path.join(root, context.params.get("source") or ""))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            raise Exception("params.source must name a file inside KB_SOURCE_DIRECTORY")
+
+        # Resume from the byte offset of the first document not indexed yet
+        checkpoint = context.checkpoint or {}
+        offset, count = checkpoint.get("offset", 0), checkpoint.get("documents", 0)
+        context.report(bytes_total=os.path.getsize(path))
+        while True:
+            batch, offset = await asyncio.to_thread(
+                read_jsonl_documents, path, offset, settings.JOB_KNOWLEDGE_BASE_SLICE_SIZE
+            )
+            if not batch:
+                break
+            outcome = (await self.llm.update_knowledge_base(batch))["ingestion"]
+            count += len(batch)
+            context.report(
+                bytes_done=offset,
+                documents=count,
+                indexed=context.progress.get("indexed", 0) + outcome["indexed"],
+                duplicates=context.progress.get("duplicates", 0) + outcome["duplicates"],
+            )
+            await context.save_checkpoint({"offset": offset, "documents": count})
+        return dict(context.progress)
+
+    async def _recommendation_training_job(self, context: JobContext) -> Dict[str, Any]:
+        """Train on interactions since params["since"]; an interrupted run starts over.
+
+        Cancelling returns only once the training thread has stopped, so
+        the job is never reported finished or requeued while it still runs.
+        """
+        since = context.params.get("since")
+        result = await self.recommendation.train_model(
+            since=datetime.fromisoformat(since) if since else None
+        )
+        return result["metrics"]
+
+    async def shutdown(self) -> None:
+        """Release the services"""
+        self.ready = False
+        if self.jobs is not None:
+            await self.jobs.stop()
+        self.jobs = None
+        self.consultation = None
+        if self.history is not None:
+            await self.history.stop()
+        self.history = None
+        if self.feedback is not None:
+            await self.feedback.stop()
+        self.feedback = None
+        if self.interactions is not None:
+            await self.interactions.stop()
+        self.interactions = None
+        if self.llm is not None:
+            await self.llm.stop()
+        self.llm = None
+        if self.recommendation is not None:
+            await self.recommendation.stop()
+            self.recommendation.close()
+        self.recommendation = None
+        if self.embeddings is not None:
+            self.embeddings.close()
+        self.embeddings = None
+
+services = ServiceRegistry()
+
+def get_llm_service() -> LLMService:
+    """Dependency for getting the shared LLM service."""
+    if not services.ready or services.llm is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI services are starting up",
+        )
+    return services.llm
+
+def get_recommendation_service() -> RecommendationService:
+    """Dependency for getting the shared recommendation service."""
+    if not services.ready or services.recommendation is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI services are starting up",
+        )
+    return services.recommendation
+
+def get_consultation_pipeline() -> ConsultationPipeline:
+    """Dependency for getting the shared consultation pipeline."""
+    if not services.ready or services.consultation is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI services are starting up",
+        )
+    return services.consultation
+
+def get_job_manager() -> JobManager:
+    """Dependency for getting the shared job manager."""
+    if not services.ready or services.jobs is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI services are starting up",
+        )
+    return services.jobs
+
+def get_feedback_writer() -> BatchWriter[FeedbackCreate]:
+    """Dependency for getting the shared feedback writer."""
+    if services.feedback is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Feedback ingestion is not running",
+        )
+    return services.feedback
+
+def get_interaction_writer() -> BatchWriter[InteractionCreate]:
+    """Dependency for getting the shared interaction writer."""
+    if services.interactions is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Interaction ingestion is not running",
+        )
+    return services.interactions
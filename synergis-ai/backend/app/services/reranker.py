@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+class CrossEncoderReranker:
+    """Re-scores retrieved chunks against the question with a cross-encoder.
+
+    A cross-encoder reads the question and a chunk together, which ranks
+    far better than embedding distance, but costs a model pass per pair,
+    so it only re-orders the few dozen candidates the vector search
+    over-fetched. All pairs go through the model in batches of
+    ``batch_size`` and only the best ``top_n`` (scoring at least
+    ``min_score``) reach the prompt.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        top_n: int = 3,
+        batch_size: int = 32,
+        min_score: Optional[float] = None,
+        model: Optional[Any] = None,
+    ):
+        if model is None:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(model_name)
+        self.model = model
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._candidates = 0
+        self._kept = 0
+        self._seconds = 0.0
+
+    def rank(self, query: str, texts: List[str]) -> List[Tuple[int, float]]:
+        """Get (index, score) of the best texts for the query, best first"""
+        if not texts:
+            return []
+        started = time.perf_counter()
+        scores = np.asarray(
+            self.model.predict(
+                [(query, text) for text in texts],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        ).reshape(-1)
+        order = np.argsort(-scores)[:self.top_n]
+        ranked = [
+            (int(i), float(scores[i])) for i in order
+            if self.min_score is None or scores[i] >= self.min_score
+        ]
+        with self._lock:
+            self._calls += 1
+            self._candidates += len(texts)
+            self._kept += len(ranked)
+            self._seconds += time.perf_counter() - started
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "candidates": self._candidates,
+            "kept": self._kept,
+            "avg_seconds": round(self._seconds / self._calls, 6) if self._calls else 0.0,
+        }
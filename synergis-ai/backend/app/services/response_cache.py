@@ -0,0 +1,275 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from app.core.redis import get_redis
+
+def normalize_question(question: str) -> str:
+    """Normalize casing, punctuation and whitespace before embedding"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+class _CacheEntry:
+    def __init__(self, question: str, answer: str, embedding: np.ndarray):
+        self.question = question
+        self.answer = answer
+        self.embedding = embedding
+        self.created_at = time.monotonic()
+
+class InMemoryResponseCacheBackend:
+    """Process-local LRU+TTL store of answered questions"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Entries in creation order, which LRU reordering does not change
+        self._created: "deque[Tuple[float, str]]" = deque()
+        self._kb_version: Optional[int] = None
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def _sync_version(self, kb_version: int) -> None:
+        # Answers depend on the knowledge base, drop everything when it changes
+        if kb_version != self._kb_version:
+            self._entries.clear()
+            self._created.clear()
+            self._matrix = None
+            self._kb_version = kb_version
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._created and self._created[0][0] <= cutoff:
+            created_at, key = self._created.popleft()
+            entry = self._entries.get(key)
+            # Skip keys evicted or stored again since
+            if entry is not None and entry.created_at == created_at:
+                del self._entries[key]
+                self._matrix = None
+
+    async def lookup(self, embedding: np.ndarray, kb_version: int, min_score: float) -> Optional[Tuple[str, float]]:
+        self._sync_version(kb_version)
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        if self._matrix is None:
+            self._keys = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[key].embedding for key in self._keys])
+
+        scores = self._matrix @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] < min_score:
+            return None
+        key = self._keys[best]
+        self._entries.move_to_end(key)
+        return self._entries[key].answer, float(scores[best])
+
+    async def store(self, key: str, question: str, answer: str, embedding: np.ndarray, kb_version: int) -> None:
+        self._sync_version(kb_version)
+        entry = self._entries[key] = _CacheEntry(question, answer, embedding)
+        self._entries.move_to_end(key)
+        self._created.append((entry.created_at, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._created.clear()
+        self._matrix = None
+
+class RedisResponseCacheBackend:
+    """Redis store shared by every worker process.
+
+    Each entry lives in its own hash with a TTL; a sorted set per
+    knowledge-base version tracks last access for LRU eviction. Bumping
+    the version makes older entries unreachable until they expire.
+
+    Question embeddings are also appended to a capped stream per version,
+    which every process tails into a local embedding matrix, so a lookup
+    reads only the entries added since the last one and scores them in
+    memory. Only the best matches above the threshold are read back from
+    Redis; entries evicted there meanwhile are dropped from the matrix.
+    """
+
+    prefix = "synergis:response_cache"
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = get_redis()
+        if self.redis is None:
+            raise Exception("Redis response cache requires REDIS_HOST to be set")
+        self._kb_version: Optional[int] = None
+        self._cursor = "0-0"
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def _index_key(self, kb_version: int) -> str:
+        return f"{self.prefix}:{kb_version}:index"
+
+    def _entry_key(self, kb_version: int, key: str) -> str:
+        return f"{self.prefix}:{kb_version}:entry:{key}"
+
+    def _log_key(self, kb_version: int) -> str:
+        return f"{self.prefix}:{kb_version}:log"
+
+    async def _sync(self, kb_version: int) -> None:
+        """Bring the local embedding matrix up to date with the stream"""
+        if kb_version != self._kb_version:
+            self._kb_version = kb_version
+            self._cursor = "0-0"
+            self._vectors.clear()
+            self._matrix = None
+
+        while True:
+            response = await self.redis.xread({self._log_key(kb_version): self._cursor}, count=1000)
+            if not response:
+                return
+            messages = response[0][1]
+            for message_id, fields in messages:
+                key = fields[b"key"].decode()
+                self._vectors[key] = np.frombuffer(fields[b"embedding"], dtype=np.float32)
+                self._vectors.move_to_end(key)
+                self._cursor = message_id
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+            self._matrix = None
+            if len(messages) < 1000:
+                return
+
+    def _discard(self, key: str) -> None:
+        if self._vectors.pop(key, None) is not None:
+            self._matrix = None
+
+    async def lookup(self, embedding: np.ndarray, kb_version: int, min_score: float) -> Optional[Tuple[str, float]]:
+        await self._sync(kb_version)
+        if not self._vectors:
+            return None
+
+        if self._matrix is None:
+            self._keys = list(self._vectors.keys())
+            self._matrix = np.stack([self._vectors[key] for key in self._keys])
+        keys, scores = self._keys, self._matrix @ embedding
+
+        for best in np.argsort(-scores):
+            if scores[best] < min_score:
+                return None
+            key = keys[best]
+            answer = await self.redis.hget(self._entry_key(kb_version, key), "answer")
+            if answer is None:
+                # Evicted or expired in Redis since it was mirrored
+                self._discard(key)
+                continue
+            await self.redis.zadd(self._index_key(kb_version), {key: time.time()})
+            return answer.decode(), float(scores[best])
+        return None
+
+    async def store(self, key: str, question: str, answer: str, embedding: np.ndarray, kb_version: int) -> None:
+        index_key = self._index_key(kb_version)
+        entry_key = self._entry_key(kb_version, key)
+        log_key = self._log_key(kb_version)
+
+        pipe = self.redis.pipeline()
+        pipe.hset(entry_key, mapping={"question": question, "answer": answer})
+        pipe.expire(entry_key, self.ttl_seconds)
+        pipe.xadd(
+            log_key,
+            {"key": key, "embedding": embedding.astype(np.float32).tobytes()},
+            maxlen=self.max_entries,
+            approximate=True,
+        )
+        pipe.expire(log_key, self.ttl_seconds)
+        pipe.zadd(index_key, {key: time.time()})
+        pipe.expire(index_key, self.ttl_seconds)
+        pipe.zcard(index_key)
+        size = (await pipe.execute())[-1]
+
+        # Evict the least recently used entries beyond the size limit
+        if size > self.max_entries:
+            evicted = await self.redis.zpopmin(index_key, size - self.max_entries)
+            if evicted:
+                await self.redis.delete(*[
+                    self._entry_key(kb_version, member.decode()) for member, _ in evicted
+                ])
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.redis.scan_iter(match=f"{self.prefix}:*")]
+        if keys:
+            await self.redis.delete(*keys)
+        self._kb_version = None
+
+class ResponseCache:
+    """Semantic cache of consultation answers.
+
+    Questions are normalized and embedded, and a cached answer is reused
+    when its question embedding has a cosine similarity of at least
+    ``similarity_threshold`` with the new one and the knowledge base has
+    not changed since it was stored.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        embed: Callable[[str], Awaitable[np.ndarray]],
+        similarity_threshold: float = 0.95,
+    ):
+        self.backend = backend
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lookup_seconds = 0.0
+
+    async def embed_question(self, question: str) -> np.ndarray:
+        """Embed the normalized question as a unit-length float32 vector"""
+        vector = np.asarray(await self.embed(normalize_question(question)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, question: str, kb_version: int) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """Get a cached answer for question, along with its embedding if it could be computed"""
+        started = time.perf_counter()
+        embedding = match = None
+        try:
+            embedding = await self.embed_question(question)
+            match = await self.backend.lookup(embedding, kb_version, self.similarity_threshold)
+        except Exception:
+            # A cache or embedding outage must never fail the consultation
+            self.errors += 1
+        self._lookup_seconds += time.perf_counter() - started
+
+        if match is not None:
+            self.hits += 1
+            return match[0], embedding
+        self.misses += 1
+        return None, embedding
+
+    async def store(self, question: str, answer: str, embedding: Optional[np.ndarray], kb_version: int) -> None:
+        """Cache the answer to question"""
+        if embedding is None:
+            return
+        key = hashlib.sha1(normalize_question(question).encode()).hexdigest()
+        try:
+            await self.backend.store(key, question, answer, embedding, kb_version)
+        except Exception:
+            self.errors += 1
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_lookup_seconds": round(self._lookup_seconds / lookups, 6) if lookups else 0.0,
+        }
@@ -0,0 +1,279 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+from langchain.vectorstores import Chroma
+from langchain.vectorstores.utils import maximal_marginal_relevance
+
+from app.services.embeddings import EmbeddingService
+from app.services.lexical import LexicalIndex, query_terms
+from app.services.reranker import CrossEncoderReranker
+
+class ContextPacker:
+    """Fits retrieved documents, in rank order, into a prompt token budget.
+
+    Documents are kept whole while they fit; the first one that does not
+    is trimmed to the remaining budget when at least ``min_tokens`` are
+    left, and everything after it is dropped.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        token_counter: Optional[Callable[[str], int]] = None,
+        min_tokens: int = 32,
+    ):
+        self.max_tokens = max_tokens
+        # Roughly four characters per token when no tokenizer is given
+        self.token_counter = token_counter or (lambda text: len(text) // 4 + 1)
+        self.min_tokens = min_tokens
+
+    def pack(self, documents: List[Document]) -> List[Document]:
+        remaining = self.max_tokens
+        packed = []
+        for document in documents:
+            tokens = self.token_counter(document.page_content)
+            if tokens <= remaining:
+                packed.append(document)
+                remaining -= tokens
+                continue
+            if remaining >= self.min_tokens:
+                cut = int(len(document.page_content) * remaining / tokens)
+                text = document.page_content[:cut].rsplit(" ", 1)[0]
+                packed.append(Document(page_content=text, metadata={**document.metadata, "truncated": True}))
+            break
+        return packed
+
+class KnowledgeBaseSearch:
+    """Tunable retrieval over the Chroma knowledge base.
+
+    Questions are embedded through the shared EmbeddingService, then the
+    ``k`` nearest chunks are selected by similarity or, with
+    ``search_type="mmr"``, by maximal marginal relevance among ``fetch_k``
+    candidates; chunks below ``score_threshold`` relevance are dropped.
+    With a ``lexical`` index the dense hits are fused with its BM25
+    matches by reciprocal rank fusion, under the same score threshold,
+    and short identifier lookups such as SKUs are answered from the
+    lexical index alone, skipping the embedding model. With a
+    ``reranker`` the search over-fetches ``rerank_candidates`` chunks
+    instead and keeps only the reranker's best few. The selected ids and
+    rerank scores are cached per query embedding (or text, for keyword
+    lookups) and knowledge base version, so a repeated question costs an
+    id lookup instead of a nearest-neighbour query and any update
+    invalidates the cache in every process. The packer then fits the
+    chunks into the context budget.
+    """
+
+    def __init__(
+        self,
+        vectorstore: Chroma,
+        embeddings: EmbeddingService,
+        kb_version: Callable[[], int],
+        k: int = 4,
+        search_type: str = "similarity",
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        score_threshold: Optional[float] = None,
+        packer: Optional[ContextPacker] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_candidates: int = 20,
+        lexical: Optional[LexicalIndex] = None,
+        lexical_k: int = 20,
+        rrf_k: int = 60,
+        keyword_max_terms: int = 4,
+        cache_size: int = 1024,
+    ):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.kb_version = kb_version
+        self.k = k
+        self.search_type = search_type
+        self.lambda_mult = lambda_mult
+        self.score_threshold = score_threshold
+        self.packer = packer
+        self.reranker = reranker
+        # How many chunks the vector search selects
+        self.n_select = max(rerank_candidates, k) if reranker is not None else k
+        self.fetch_k = max(fetch_k, self.n_select)
+        self.lexical = lexical
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+        self.keyword_max_terms = keyword_max_terms
+        self.cache_size = cache_size
+        # Selected (chunk id, rerank score) pairs per question
+        self._cache: "OrderedDict[str, List[Tuple[str, Optional[float]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._keyword_queries = 0
+
+    def _cache_key(self, query: str, vector: Optional[np.ndarray]) -> str:
+        digest = hashlib.sha1(query.encode() if vector is None else vector.tobytes()).hexdigest()
+        return f"{self.kb_version()}:{'text' if vector is None else 'vector'}:{digest}"
+
+    def _is_keyword_query(self, query: str) -> bool:
+        # A few terms, one of them with digits: a product code or model number lookup
+        terms = query_terms(query)
+        return 0 < len(terms) <= self.keyword_max_terms and any(
+            any(char.isdigit() for char in term) for term in terms
+        )
+
+    def _get_cached(self, key: str) -> Optional[List[Tuple[str, Optional[float]]]]:
+        with self._lock:
+            selected = self._cache.get(key)
+            if selected is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            return selected
+
+    def _put_cached(self, key: str, selected: List[Tuple[str, Optional[float]]]) -> None:
+        with self._lock:
+            self._cache[key] = selected
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _query(self, vector: np.ndarray) -> List[Tuple[str, Document]]:
+        mmr = self.search_type == "mmr"
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if mmr else [])
+        result = self.vectorstore._collection.query(
+            query_embeddings=[vector.tolist()],
+            n_results=self.fetch_k if mmr else self.n_select,
+            include=include,
+        )
+        ids, texts, metadatas = result["ids"][0], result["documents"][0], result["metadatas"][0]
+
+        rows = list(range(len(ids)))
+        if self.score_threshold is not None:
+            relevance = self.vectorstore._select_relevance_score_fn()
+            rows = [row for row in rows if relevance(result["distances"][0][row]) >= self.score_threshold]
+        if mmr and rows:
+            candidates = [result["embeddings"][0][row] for row in rows]
+            rows = [rows[i] for i in maximal_marginal_relevance(vector, candidates, self.lambda_mult, self.n_select)]
+        return [
+            (ids[row], Document(page_content=texts[row], metadata=metadatas[row] or {}))
+            for row in rows[:self.n_select]
+        ]
+
+    def _rerank(self, query: str, hits: List[Tuple[str, Document]]) -> List[Tuple[str, Document]]:
+        ranked = self.reranker.rank(query, [document.page_content for _, document in hits])
+        reranked = []
+        for i, score in ranked:
+            chunk_id, document = hits[i]
+            document = Document(page_content=document.page_content, metadata={**document.metadata, "rerank_score": score})
+            reranked.append((chunk_id, document))
+        return reranked
+
+    def _fetch(self, ids: List[str]) -> List[Tuple[str, Document]]:
+        if not ids:
+            return []
+        result = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas"])
+        found = {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        # Chroma does not return rows in the requested order
+        return [(chunk_id, found[chunk_id]) for chunk_id in ids if chunk_id in found]
+
+    def _distances(self, vector: np.ndarray, embeddings: List[List[float]]) -> np.ndarray:
+        """Distances as the collection's HNSW space defines them"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        space = (self.vectorstore._collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "l2":
+            return ((matrix - vector) ** 2).sum(axis=1)
+        if space == "ip":
+            return 1.0 - matrix @ vector
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+        return 1.0 - (matrix @ vector) / np.maximum(norms, 1e-12)
+
+    def _fetch_relevant(self, ids: List[str], vector: np.ndarray) -> List[Tuple[str, Document]]:
+        """Fetch chunks the dense search did not return, dropping those below the score threshold"""
+        if self.score_threshold is None:
+            return self._fetch(ids)
+        if not ids:
+            return []
+        result = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        if not result["ids"]:
+            return []
+        relevance = self.vectorstore._select_relevance_score_fn()
+        distances = self._distances(vector, result["embeddings"])
+        return [
+            (chunk_id, Document(page_content=text, metadata=metadata or {}))
+            for chunk_id, text, metadata, distance in zip(
+                result["ids"], result["documents"], result["metadatas"], distances
+            )
+            if relevance(float(distance)) >= self.score_threshold
+        ]
+
+    def _fuse(
+        self, vector: np.ndarray, dense: List[Tuple[str, Document]], lexical: List[Tuple[str, float]]
+    ) -> List[Tuple[str, Document]]:
+        """Reciprocal rank fusion of dense hits and lexical matches"""
+        scores: Dict[str, float] = {}
+        for ranking in (dense, lexical):
+            for rank, (chunk_id, _) in enumerate(ranking):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        # Dense hits passed the score threshold already, hold lexical-only ones to it too
+        documents = dict(dense)
+        documents.update(self._fetch_relevant(
+            [chunk_id for chunk_id, _ in lexical if chunk_id not in documents], vector
+        ))
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [(chunk_id, documents[chunk_id]) for chunk_id in ranked if chunk_id in documents][:self.n_select]
+
+    def _select(self, query: str, vector: Optional[np.ndarray]) -> List[Tuple[str, Document]]:
+        if vector is None:
+            hits = self._fetch([chunk_id for chunk_id, _ in self.lexical.search(query, self.n_select)])
+            if hits:
+                return hits
+            # Nothing matched the terms, fall back to meaning
+            vector = self.embeddings.embed_many([query])[0]
+        dense = self._query(vector)
+        if self.lexical is None:
+            return dense
+        return self._fuse(vector, dense, self.lexical.search(query, self.lexical_k))
+
+    def search(self, query: str) -> List[Document]:
+        """Get the packed context documents for a question"""
+        vector = None
+        if self.lexical is not None and self._is_keyword_query(query):
+            self._keyword_queries += 1
+        else:
+            vector = self.embeddings.embed_many([query])[0]
+        key = self._cache_key(query, vector)
+        selected = self._get_cached(key)
+        if selected is None:
+            hits = self._select(query, vector)
+            if self.reranker is not None:
+                # Cached after reranking, so a repeated question skips the reranker too
+                hits = self._rerank(query, hits)
+            self._put_cached(key, [(chunk_id, document.metadata.get("rerank_score")) for chunk_id, document in hits])
+            documents = [document for _, document in hits]
+        else:
+            scores = dict(selected)
+            documents = [
+                document if scores[chunk_id] is None
+                else Document(page_content=document.page_content, metadata={**document.metadata, "rerank_score": scores[chunk_id]})
+                for chunk_id, document in self._fetch([chunk_id for chunk_id, _ in selected])
+            ]
+        return self.packer.pack(documents) if self.packer else documents
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_entries": len(self._cache),
+            "cache_hits": self._hits,
+            "cache_misses": self._misses,
+            "keyword_queries": self._keyword_queries,
+        }
+
+class KnowledgeBaseRetriever(BaseRetriever):
+    """LangChain retriever backed by a shared KnowledgeBaseSearch"""
+
+    search: Any
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.search.search(query)
@@ -0,0 +1,353 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+class TrainingCancelled(Exception):
+    """Raised inside a training run once it has been asked to stop"""
+
+def _check_stop(should_stop: Optional[Callable[[], bool]]) -> None:
+    if should_stop is not None and should_stop():
+        raise TrainingCancelled("Training was cancelled")
+
+class InteractionSpool:
+    """Integer-encoded interactions appended to growable on-disk arrays.
+
+    A small random sample of interactions, capped at ``max_holdout``, is
+    kept aside in memory for evaluation instead of being trained on.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        item_row: Callable[[str], Optional[int]],
+        initial_capacity: int = 1 << 20,
+        holdout_fraction: float = 0.01,
+        max_holdout: int = 10000,
+        seed: int = 0,
+    ):
+        self.directory = directory
+        self.item_row = item_row
+        self.holdout_fraction = holdout_fraction
+        self.max_holdout = max_holdout
+        self.users: Dict[str, int] = {}
+        self.user_ids: List[str] = []
+        self.count = 0
+        self.skipped = 0
+        self.holdout: List[Tuple[int, int]] = []
+        self._rng = np.random.default_rng(seed)
+        self._capacity = 0
+        self._arrays: Dict[str, np.memmap] = {}
+        self._resize(max(1, initial_capacity))
+
+    @property
+    def paths(self) -> Dict[str, str]:
+        return {name: os.path.join(self.directory, f"{name}.bin") for name in ("users", "items", "weights")}
+
+    def _resize(self, capacity: int) -> None:
+        dtypes = {"users": np.int32, "items": np.int32, "weights": np.float32}
+        for name, path in self.paths.items():
+            if name in self._arrays:
+                self._arrays[name].flush()
+                del self._arrays[name]
+            with open(path, "ab") as f:
+                f.truncate(capacity * 4)
+            self._arrays[name] = np.memmap(path, dtype=dtypes[name], mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def _user_row(self, user_id: str) -> int:
+        row = self.users.get(user_id)
+        if row is None:
+            row = self.users[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+        return row
+
+    def append(self, chunk: List[Tuple[str, str, float]]) -> None:
+        """Encode a chunk of (user_id, item_id, weight) rows"""
+        users, items, weights = [], [], []
+        for user_id, item_id, weight in chunk:
+            item = self.item_row(str(item_id))
+            if item is None:
+                # Items missing from the catalog cannot be recommended
+                self.skipped += 1
+                continue
+            users.append(self._user_row(str(user_id)))
+            items.append(item)
+            weights.append(weight)
+        if not users:
+            return
+
+        users = np.asarray(users, dtype=np.int32)
+        items = np.asarray(items, dtype=np.int32)
+        keep = np.ones(len(users), dtype=bool)
+        room = self.max_holdout - len(self.holdout)
+        if room > 0:
+            held = np.flatnonzero(self._rng.random(len(users)) < self.holdout_fraction)[:room]
+            self.holdout.extend(zip(users[held].tolist(), items[held].tolist()))
+            keep[held] = False
+
+        size = int(keep.sum())
+        if self.count + size > self._capacity:
+            capacity = self._capacity
+            while capacity < self.count + size:
+                capacity *= 2
+            self._resize(capacity)
+        end = self.count + size
+        self._arrays["users"][self.count:end] = users[keep]
+        self._arrays["items"][self.count:end] = items[keep]
+        self._arrays["weights"][self.count:end] = np.asarray(weights, dtype=np.float32)[keep]
+        self.count = end
+
+    def flush(self) -> None:
+        for array in self._arrays.values():
+            array.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._arrays = {}
+
+# Per-process state of the loader workers
+_loader: Dict[str, Any] = {}
+
+def _init_loader(paths: Dict[str, str], count: int, n_items: int) -> None:
+    _loader["users"] = np.memmap(paths["users"], dtype=np.int32, mode="r", shape=(count,))
+    _loader["items"] = np.memmap(paths["items"], dtype=np.int32, mode="r", shape=(count,))
+    _loader["weights"] = np.memmap(paths["weights"], dtype=np.float32, mode="r", shape=(count,))
+    _loader["count"] = count
+    _loader["n_items"] = n_items
+
+def _load_batch(task: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sample a mini-batch of positives with one uniformly drawn negative item each"""
+    seed, batch_size = task
+    rng = np.random.default_rng(seed)
+    # Sorted indices turn random access into a forward scan of the maps
+    rows = np.sort(rng.integers(0, _loader["count"], batch_size))
+    return (
+        np.asarray(_loader["users"][rows]),
+        np.asarray(_loader["items"][rows]),
+        rng.integers(0, _loader["n_items"], batch_size).astype(np.int32),
+        np.asarray(_loader["weights"][rows]),
+    )
+
+class MatrixFactorizationTrainer:
+    """BPR matrix factorization trained with mini-batch SGD on CPU.
+
+    Mini-batches are sampled from the spooled interactions by a pool of
+    loader processes. Item factors start from, and are regularized towards,
+    the catalog text embeddings, so user vectors live in the same space as
+    the conversation features the online recommender scores with.
+    """
+
+    def __init__(
+        self,
+        epochs: int = 5,
+        batch_size: int = 4096,
+        learning_rate: float = 0.05,
+        regularization: float = 0.01,
+        item_regularization: float = 0.1,
+        workers: int = 2,
+        prefetch: int = 8,
+        seed: int = 0,
+    ):
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.regularization = regularization
+        self.item_regularization = item_regularization
+        self.workers = workers
+        self.prefetch = prefetch
+        self.seed = seed
+
+    def _batches(self, spool: InteractionSpool, n_items: int, epoch: int, pool: Any) -> Iterable[Tuple[np.ndarray, ...]]:
+        n_batches = max(1, spool.count // self.batch_size)
+        tasks = ((self.seed * 1_000_003 + epoch * n_batches + b, self.batch_size) for b in range(n_batches))
+        if pool is None:
+            _init_loader(spool.paths, spool.count, n_items)
+            for task in tasks:
+                yield _load_batch(task)
+            return
+
+        # Keep a bounded number of batches in flight so memory does not grow with the data
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_load_batch, (task,)))
+            if len(pending) >= self.prefetch:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def fit(
+        self,
+        spool: InteractionSpool,
+        item_vectors: np.ndarray,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Train on the spooled interactions and return user vectors, item vectors and metrics.
+
+        ``should_stop`` is polled between mini-batches; once it returns True
+        training raises TrainingCancelled.
+        """
+        spool.flush()
+        if spool.count == 0:
+            raise Exception("No interactions to train on")
+
+        rng = np.random.default_rng(self.seed)
+        content = np.asarray(item_vectors, dtype=np.float32)
+        n_items, dim = content.shape
+        items = content.copy()
+        users = (rng.standard_normal((len(spool.user_ids), dim)) * 0.1 / np.sqrt(dim)).astype(np.float32)
+
+        pool = None
+        if self.workers > 0:
+            # Spawn rather than fork, the serving process may hold threads and model handles
+            pool = multiprocessing.get_context("spawn").Pool(
+                self.workers, initializer=_init_loader, initargs=(spool.paths, spool.count, n_items)
+            )
+
+        losses = []
+        try:
+            for epoch in range(self.epochs):
+                total, batches = 0.0, 0
+                for u, i, j, w in self._batches(spool, n_items, epoch, pool):
+                    _check_stop(should_stop)
+                    pu, qi, qj = users[u], items[i], items[j]
+                    x = np.einsum("ij,ij->i", pu, qi - qj)
+                    g = w * 0.5 * (1.0 - np.tanh(x / 2))  # w * sigmoid(-x), overflow-free
+                    total += float(np.mean(w * np.logaddexp(0.0, -x)))
+                    batches += 1
+
+                    lr = self.learning_rate
+                    np.add.at(users, u, lr * (g[:, None] * (qi - qj) - self.regularization * pu))
+                    np.add.at(items, i, lr * (g[:, None] * pu - self.item_regularization * (qi - content[i])))
+                    np.add.at(items, j, lr * (-g[:, None] * pu - self.item_regularization * (qj - content[j])))
+                losses.append(total / max(1, batches))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        metrics = {
+            "interactions": spool.count,
+            "users": len(spool.user_ids),
+            "items": n_items,
+            "skipped": spool.skipped,
+            "epochs": self.epochs,
+            "loss": round(losses[-1], 6),
+            **self.evaluate(users, items, spool.holdout),
+        }
+        return users, items, metrics
+
+    def evaluate(
+        self,
+        users: np.ndarray,
+        items: np.ndarray,
+        holdout: List[Tuple[int, int]],
+        n_negatives: int = 100,
+        k: int = 10,
+    ) -> Dict[str, float]:
+        """AUC and hit rate@k of held-out interactions against sampled negatives"""
+        if not holdout:
+            return {}
+        rng = np.random.default_rng(self.seed + 1)
+        u, i = (np.asarray(column) for column in zip(*holdout))
+        negatives = rng.integers(0, len(items), (len(u), n_negatives))
+        positive = np.einsum("ij,ij->i", users[u], items[i])
+        negative = np.einsum("ij,inj->in", users[u], items[negatives])
+        rank = (negative > positive[:, None]).sum(axis=1)
+        return {
+            "auc": round(float(np.mean(negative < positive[:, None])), 4),
+            f"hit_rate_at_{k}": round(float(np.mean(rank < k)), 4),
+        }
+
+def train_from_database(
+    catalog: Any,
+    catalog_store: Any,
+    user_store: Any,
+    trainer: MatrixFactorizationTrainer,
+    chunk_size: int = 50000,
+    since: Optional[datetime] = None,
+    work_directory: Optional[str] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """Stream interactions, train, and publish item and user vectors.
+
+    Item vectors are published as a new catalog version, which serving
+    workers hot-load, and user vectors are written to the shared user store.
+    ``should_stop`` is polled between interaction chunks and mini-batches,
+    and once more before publishing; a cancelled run publishes nothing.
+    """
+    from app.crud.interaction import interaction
+    from app.db.session import SessionLocal
+
+    started = time.perf_counter()
+    # Train against a fixed view of the catalog; items added meanwhile keep their vectors
+    item_ids, item_vectors = catalog.snapshot()
+    item_rows = {item_id: row for row, item_id in enumerate(item_ids)}
+
+    with tempfile.TemporaryDirectory(dir=work_directory) as directory:
+        spool = InteractionSpool(directory, item_rows.get, seed=trainer.seed)
+        db = SessionLocal()
+        try:
+            for chunk in interaction.stream(db, chunk_size=chunk_size, since=since):
+                _check_stop(should_stop)
+                spool.append(chunk)
+        finally:
+            db.close()
+        user_vectors, trained_items, metrics = trainer.fit(spool, item_vectors, should_stop)
+        spool.close()
+
+    _check_stop(should_stop)
+
+    user_vectors /= np.maximum(np.linalg.norm(user_vectors, axis=1, keepdims=True), 1e-12)
+    for start in range(0, len(spool.user_ids), chunk_size):
+        user_store.put_many(spool.user_ids[start:start + chunk_size], user_vectors[start:start + chunk_size])
+
+    metrics["catalog_version"] = catalog.save(catalog_store, trained=(item_ids, trained_items))
+    metrics["seconds"] = round(time.perf_counter() - started, 1)
+    return metrics
+
+def main() -> None:
+    import argparse
+    import json
+
+    from app.core.config import settings
+    from app.services.catalog import CatalogIndex
+    from app.services.vector_store import UserVectorStore, VersionedVectorStore
+
+    parser = argparse.ArgumentParser(description="Train the recommender from stored interactions")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--epochs", type=int, default=settings.RECOMMENDATION_TRAIN_EPOCHS)
+    parser.add_argument("--workers", type=int, default=settings.RECOMMENDATION_TRAIN_WORKERS)
+    args = parser.parse_args()
+
+    if not settings.RECOMMENDATION_STORE_PATH:
+        raise SystemExit("RECOMMENDATION_STORE_PATH must be set to publish trained vectors")
+    catalog_store = VersionedVectorStore(os.path.join(settings.RECOMMENDATION_STORE_PATH, "catalog"))
+    snapshot = catalog_store.open(mode="c")
+    if snapshot is None:
+        raise SystemExit("No published catalog to train against")
+    catalog = CatalogIndex.from_snapshot(snapshot)
+    user_store = UserVectorStore(os.path.join(settings.RECOMMENDATION_STORE_PATH, "users"), catalog.dim)
+
+    trainer = MatrixFactorizationTrainer(
+        epochs=args.epochs,
+        batch_size=settings.RECOMMENDATION_TRAIN_BATCH_SIZE,
+        learning_rate=settings.RECOMMENDATION_TRAIN_LEARNING_RATE,
+        regularization=settings.RECOMMENDATION_TRAIN_REGULARIZATION,
+        workers=args.workers,
+    )
+    try:
+        metrics = train_from_database(
+            catalog, catalog_store, user_store, trainer,
+            chunk_size=settings.RECOMMENDATION_TRAIN_CHUNK_SIZE, since=args.since,
+        )
+    finally:
+        user_store.close()
+    print(json.dumps(metrics, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIRECTORY = "versions"
+
+class VectorSnapshot:
+    """Read view of one published version.
+
+    Arrays are opened lazily as memory maps, so every worker process that
+    opens the same version shares its pages through the OS page cache
+    instead of holding a private copy. With ``mode="c"`` writes stay
+    private to the process (copy-on-write) and never reach the file.
+    """
+
+    def __init__(self, version: str, path: str, mode: str = "r"):
+        self.version = version
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, "meta.json")) as f:
+            self.metadata: Dict[str, Any] = json.load(f)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=self.mode)
+        return self._arrays[name]
+
+    def has_array(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, f"{name}.npy"))
+
+    def document(self, name: str) -> Any:
+        with open(os.path.join(self.path, f"{name}.json")) as f:
+            return json.load(f)
+
+    def has_document(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, f"{name}.json"))
+
+class SnapshotWriter:
+    """Builds a new version in a staging directory; nothing is visible until commit"""
+
+    def __init__(self, store: "VersionedVectorStore", metadata: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.metadata = dict(metadata or {})
+        now = time.time()
+        # Sortable by creation time, unique across concurrent writers
+        self.version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}.{int(now % 1 * 1000):03d}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(store.versions_path, f".tmp-{self.version}")
+        os.makedirs(self.path)
+        self._arrays: List[np.memmap] = []
+
+    def create_array(self, name: str, shape: Tuple[int, ...], dtype: Any = np.float32) -> np.memmap:
+        """Allocate an on-disk array to fill in place, e.g. chunk by chunk"""
+        array = np.lib.format.open_memmap(
+            os.path.join(self.path, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape
+        )
+        self._arrays.append(array)
+        return array
+
+    def write_array(self, name: str, values: np.ndarray) -> None:
+        self.create_array(name, values.shape, values.dtype)[...] = values
+
+    def write_document(self, name: str, value: Any) -> None:
+        with open(os.path.join(self.path, f"{name}.json"), "w") as f:
+            json.dump(value, f)
+
+    def commit(self) -> str:
+        """Flush the version to disk and make it current"""
+        for array in self._arrays:
+            array.flush()
+        self._arrays = []
+        self.metadata.setdefault("created_at", time.time())
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.metadata, f)
+        os.rename(self.path, os.path.join(self.store.versions_path, self.version))
+        self.store._set_current(self.version)
+        return self.version
+
+    def abort(self) -> None:
+        self._arrays = []
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        elif os.path.exists(self.path):
+            self.commit()
+
+class VersionedVectorStore:
+    """Directory of immutable, memory-mapped array versions.
+
+    Each version lives in ``versions/<version>`` as ``.npy`` arrays plus
+    JSON documents. ``CURRENT`` names the live version and is replaced
+    atomically, so a retrained catalog is swapped in without readers ever
+    seeing a partially written one. Older versions are kept until pruned,
+    so processes still mapping them keep working.
+    """
+
+    def __init__(self, root: str, keep_versions: int = 3):
+        self.root = root
+        self.keep_versions = keep_versions
+        self.versions_path = os.path.join(root, VERSIONS_DIRECTORY)
+        os.makedirs(self.versions_path, exist_ok=True)
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.versions_path)
+            if not name.startswith(".")
+        )
+
+    def open(self, version: Optional[str] = None, mode: str = "r") -> Optional[VectorSnapshot]:
+        """Open a version, the current one by default"""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        return VectorSnapshot(version, os.path.join(self.versions_path, version), mode=mode)
+
+    def writer(self, metadata: Optional[Dict[str, Any]] = None) -> SnapshotWriter:
+        return SnapshotWriter(self, metadata)
+
+    def publish(
+        self,
+        arrays: Dict[str, np.ndarray],
+        documents: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Write a complete version from in-memory values and make it current"""
+        with self.writer(metadata) as writer:
+            for name, values in arrays.items():
+                writer.write_array(name, values)
+            for name, value in (documents or {}).items():
+                writer.write_document(name, value)
+        return writer.version
+
+    def _set_current(self, version: str) -> None:
+        tmp_path = os.path.join(self.root, f".{CURRENT_FILE}.{uuid.uuid4().hex}")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        self.prune()
+
+    def prune(self) -> None:
+        """Delete all but the newest ``keep_versions`` versions, never the current one"""
+        current = self.current_version()
+        for version in self.versions()[:-self.keep_versions]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.versions_path, version), ignore_errors=True)
+
+class UserVectorStore:
+    """Fixed-size float32 vector per user in a shared, writable memory map.
+
+    Rows are assigned through a small SQLite index, so concurrent worker
+    processes agree on which row belongs to which user, and the vectors
+    file is mapped shared so an update made by one worker is visible to
+    the others without copying. The file grows by doubling.
+    """
+
+    def __init__(self, path: str, dim: int, initial_capacity: int = 1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.initial_capacity = max(1, initial_capacity)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._map: Optional[np.memmap] = None
+
+        self._conn = sqlite3.connect(
+            os.path.join(path, "index.sqlite3"), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        stored_dim = int(self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()[0])
+        if stored_dim != dim:
+            raise Exception(f"User vector store at {path} has dimension {stored_dim}, expected {dim}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def _mapped(self, rows: int) -> np.memmap:
+        """Map the vectors file, remapping when another process has grown it"""
+        if self._map is None or self._map.shape[0] < rows:
+            capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+            self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        return self._map
+
+    def _grow(self, rows: int) -> None:
+        # Called inside a write transaction, which serializes growth across processes
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        capacity = size // (4 * self.dim)
+        if capacity >= rows:
+            return
+        capacity = max(capacity, self.initial_capacity)
+        while capacity < rows:
+            capacity *= 2
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+
+    def _lookup(self, user_ids: List[str]) -> Dict[str, int]:
+        missing = [user_id for user_id in user_ids if user_id not in self._rows]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            self._rows.update(self._conn.execute(
+                f"SELECT user_id, row FROM users WHERE user_id IN ({placeholders})", chunk
+            ).fetchall())
+        return {user_id: self._rows[user_id] for user_id in user_ids if user_id in self._rows}
+
+    def _allocate(self, user_ids: List[str]) -> Dict[str, int]:
+        rows = self._lookup(user_ids)
+        new_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id not in rows))
+        if not new_ids:
+            return rows
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have added some of them since the lookup
+            self._rows.update(self._lookup(new_ids))
+            new_ids = [user_id for user_id in new_ids if user_id not in self._rows]
+            next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM users").fetchone()[0]
+            assigned = [(user_id, next_row + i) for i, user_id in enumerate(new_ids)]
+            self._conn.executemany("INSERT INTO users (user_id, row) VALUES (?, ?)", assigned)
+            self._grow(next_row + len(assigned))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._rows.update(assigned)
+        return {user_id: self._rows[user_id] for user_id in user_ids}
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        vectors = self.get_many([user_id])
+        return vectors.get(user_id)
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Copies of the stored vectors of the known users among user_ids"""
+        with self._lock:
+            rows = self._lookup(list(user_ids))
+            if not rows:
+                return {}
+            vectors = self._mapped(max(rows.values()) + 1)
+            return {user_id: np.array(vectors[row]) for user_id, row in rows.items()}
+
+    def put_many(self, user_ids: List[str], vectors: np.ndarray) -> None:
+        """Write one vector per user, adding unknown users"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(user_ids), self.dim)
+        with self._lock:
+            rows = self._allocate(list(user_ids))
+            mapped = self._mapped(max(rows.values()) + 1)
+            mapped[[rows[user_id] for user_id in user_ids]] = vectors
+            mapped.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map = None
+            self._conn.close()
+
+class InMemoryUserVectorStore:
+    """Process-local counterpart of UserVectorStore for when no store path is configured"""
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((max(1, initial_capacity), dim), dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        return self.get_many([user_id]).get(user_id)
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {
+                user_id: self._vectors[self._rows[user_id]].copy()
+                for user_id in user_ids if user_id in self._rows
+            }
+
+    def put_many(self, user_ids: List[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(user_ids), self.dim)
+        with self._lock:
+            for user_id in user_ids:
+                self._rows.setdefault(user_id, len(self._rows))
+            if len(self._rows) > len(self._vectors):
+                capacity = len(self._vectors)
+                while capacity < len(self._rows):
+                    capacity *= 2
+                grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                grown[:len(self._vectors)] = self._vectors
+                self._vectors = grown
+            self._vectors[[self._rows[user_id] for user_id in user_ids]] = vectors
+
+    def close(self) -> None:
+        pass
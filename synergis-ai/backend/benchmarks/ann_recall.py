@@ -0,0 +1,62 @@
+"""Recall@k and latency of the IVF recommendation index against exact search.
+
+Usage:
+    python -m benchmarks.ann_recall --items 200000 --dim 384 --probes 1 4 8 16 32
+"""
+import argparse
+import time
+import numpy as np
+
+from app.services.ann import IVFIndex
+from app.services.catalog import CatalogIndex, normalize_rows
+
+def make_catalog(n_items: int, dim: int, n_topics: int, noise: float, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real item embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    topics = normalize_rows(rng.standard_normal((n_topics, dim)))
+    members = rng.integers(0, n_topics, n_items)
+    return normalize_rows(topics[members] + noise * rng.standard_normal((n_items, dim)) / np.sqrt(dim))
+
+def timed_search(catalog: CatalogIndex, queries: np.ndarray, k: int, **kwargs):
+    results, started = [], time.perf_counter()
+    for query in queries:
+        results.append({item["id"] for item, _ in catalog.search(query, k, **kwargs)})
+    return results, (time.perf_counter() - started) / len(queries) * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.7)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = make_catalog(args.items, args.dim, args.topics, args.noise, args.seed)
+    catalog = CatalogIndex(args.dim, initial_capacity=args.items)
+    catalog.add([{"id": str(i)} for i in range(args.items)], vectors)
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(args.items, args.queries, replace=False)]
+    queries = normalize_rows(queries + 0.05 * rng.standard_normal(queries.shape))
+
+    started = time.perf_counter()
+    catalog.ann = IVFIndex.train(catalog.vectors, n_lists=args.lists)
+    print(f"items={args.items} dim={args.dim} lists={catalog.ann.n_lists} "
+          f"train={time.perf_counter() - started:.1f}s")
+
+    exact, exact_ms = timed_search(catalog, queries, args.k, exact=True)
+    print(f"{'mode':>10} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>10} {1.0:>10.3f} {exact_ms:>10.2f} {1.0:>8.1f}")
+
+    for n_probe in args.probes:
+        approx, approx_ms = timed_search(catalog, queries, args.k, n_probe=n_probe)
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)])
+        print(f"{'ivf/' + str(n_probe):>10} {recall:>10.3f} {approx_ms:>10.2f} {exact_ms / approx_ms:>8.1f}")
+
+if __name__ == "__main__":
+    main()
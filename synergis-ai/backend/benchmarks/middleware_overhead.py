@@ -0,0 +1,95 @@
+"""Requests/sec through the rate limiter as BaseHTTPMiddleware and as pure ASGI middleware.
+
+Usage:
+    python -m benchmarks.middleware_overhead --requests 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.rate_limiter import RateLimiter
+
+class BaseHTTPRateLimiter(BaseHTTPMiddleware):
+    """The previous dispatch-based limiter, kept here as the baseline"""
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app)
+        self.limiter = RateLimiter(app, **kwargs)
+
+    async def dispatch(self, request: Request, call_next):
+        result = await self.limiter.check(request.scope)
+        headers = {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Remaining": str(result.remaining),
+        }
+        if not result.allowed:
+            headers["Retry-After"] = str(result.retry_after)
+            return JSONResponse(status_code=429, content={"detail": "Too many requests"}, headers=headers)
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(16):
+                yield b"data: token\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    if middleware is not None:
+        # Limits high enough that every request is admitted and reaches the endpoint
+        app.add_middleware(middleware, requests_limit=10**9, window_seconds=60)
+    return app
+
+async def requests_per_second(app: FastAPI, path: str, n_requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(n_requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency // 4 or 1)))  # warm up
+        remaining = iter(range(n_requests))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return n_requests / (time.perf_counter() - started)
+
+async def run(args) -> None:
+    variants = [
+        ("none", None),
+        ("basehttp", BaseHTTPRateLimiter),
+        ("asgi", RateLimiter),
+    ]
+    print(f"requests={args.requests} concurrency={args.concurrency}")
+    print(f"{'path':>8} {'middleware':>10} {'req/s':>10} {'overhead':>9}")
+    for path in args.paths:
+        baseline = None
+        for name, middleware in variants:
+            rps = await requests_per_second(make_app(middleware), path, args.requests, args.concurrency)
+            baseline = baseline or rps
+            print(f"{path:>8} {name:>10} {rps:>10.0f} {(baseline / rps - 1) * 100:>8.1f}%")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--paths", nargs="+", default=["/ping", "/stream"])
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Prompt tokens and latency of knowledge base retrieval with and without cross-encoder reranking.
+
+The corpus is ingested into a scratch Chroma collection through the
+app's KnowledgeBaseIngestor, and both modes run the app's
+KnowledgeBaseSearch and ContextPacker with the RETRIEVAL_* settings, so
+the baseline is the context production sends. Each query is the longest
+sentence of a randomly sampled chunk, and the hit rate counts how often
+that chunk reaches the prompt context. Tokens use the packer's estimate
+rather than the LLM's tokenizer.
+
+Usage:
+    python -m benchmarks.rerank_context --corpus docs/ --candidates 20 --top-n 3
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.vectorstores import Chroma
+
+from app.core.config import settings
+from app.services.embeddings import EmbeddingService
+from app.services.ingestion import KnowledgeBaseIngestor
+from app.services.lexical import LexicalIndex
+from app.services.reranker import CrossEncoderReranker
+from app.services.retrieval import ContextPacker, KnowledgeBaseSearch
+
+def load_documents(corpus: str) -> List[Document]:
+    return [
+        Document(page_content=path.read_text(errors="ignore"), metadata={"source": str(path)})
+        for path in sorted(Path(corpus).rglob("*"))
+        if path.suffix in (".txt", ".md") and path.is_file()
+    ]
+
+def make_queries(chunks: List[str], n_queries: int, seed: int) -> List[Tuple[str, str]]:
+    """(query, source chunk) pairs, taking each chunk's longest sentence as the question"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for row in rng.permutation(len(chunks)):
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", chunks[row]) if len(s.split()) >= 6]
+        if sentences:
+            queries.append((max(sentences, key=len), chunks[row]))
+        if len(queries) == n_queries:
+            break
+    return queries
+
+def reached_context(source: str, documents: List[Document]) -> bool:
+    return any(
+        document.page_content == source
+        or (document.metadata.get("truncated") and source.startswith(document.page_content))
+        for document in documents
+    )
+
+def build_search(
+    vectorstore: Chroma,
+    model: HuggingFaceEmbeddings,
+    packer: ContextPacker,
+    lexical: Optional[LexicalIndex],
+    reranker: Optional[CrossEncoderReranker],
+    candidates: int,
+) -> KnowledgeBaseSearch:
+    return KnowledgeBaseSearch(
+        vectorstore,
+        # Uncached, so neither mode reuses the other's query embeddings
+        EmbeddingService(model, cache_size=0, cache_path=None),
+        kb_version=lambda: 0,
+        k=settings.RETRIEVAL_K,
+        search_type=settings.RETRIEVAL_SEARCH_TYPE,
+        fetch_k=settings.RETRIEVAL_FETCH_K,
+        lambda_mult=settings.RETRIEVAL_MMR_LAMBDA,
+        score_threshold=settings.RETRIEVAL_SCORE_THRESHOLD,
+        packer=packer,
+        reranker=reranker,
+        rerank_candidates=candidates,
+        lexical=lexical,
+        lexical_k=settings.RETRIEVAL_LEXICAL_K,
+        rrf_k=settings.RETRIEVAL_RRF_K,
+        keyword_max_terms=settings.RETRIEVAL_KEYWORD_MAX_TERMS,
+        cache_size=0,
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", required=True, help="directory of .txt/.md files")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=settings.RETRIEVAL_RERANK_CANDIDATES)
+    parser.add_argument("--top-n", type=int, default=settings.RETRIEVAL_RERANK_TOP_N)
+    parser.add_argument("--embedding-model", default="sentence-transformers/all-mpnet-base-v2",
+                        help="HuggingFaceEmbeddings default, as served")
+    parser.add_argument("--rerank-model", default=settings.RETRIEVAL_RERANK_MODEL or "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--prompt-tps", type=float, default=50.0,
+                        help="prompt evaluation speed of the LLM in tokens/s, to estimate time saved")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = load_documents(args.corpus)
+    if not documents:
+        parser.error("the corpus has no .txt or .md files")
+
+    model = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    packer = ContextPacker(settings.RETRIEVAL_MAX_CONTEXT_TOKENS)
+    with tempfile.TemporaryDirectory() as directory:
+        vectorstore = Chroma(
+            collection_name="rerank_benchmark",
+            embedding_function=EmbeddingService(model, cache_path=None),
+            persist_directory=directory,
+        )
+        lexical = LexicalIndex(
+            os.path.join(directory, "lexical.sqlite3"),
+            max_df=settings.RETRIEVAL_LEXICAL_MAX_DF,
+            min_match=settings.RETRIEVAL_LEXICAL_MIN_MATCH,
+            min_score=settings.RETRIEVAL_LEXICAL_MIN_SCORE,
+        ) if settings.RETRIEVAL_HYBRID else None
+        ingestor = KnowledgeBaseIngestor(
+            vectorstore,
+            vectorstore._embedding_function,
+            splitter=RecursiveCharacterTextSplitter(
+                chunk_size=settings.KB_CHUNK_SIZE,
+                chunk_overlap=settings.KB_CHUNK_OVERLAP,
+                add_start_index=True,
+            ),
+            batch_size=settings.KB_INGEST_BATCH_SIZE,
+            workers=settings.KB_INGEST_WORKERS,
+            lexical=lexical,
+        )
+        started = time.perf_counter()
+        asyncio.run(ingestor.ingest(documents))
+        ingestor.close()
+        chunks = vectorstore._collection.get(include=["documents"])["documents"]
+        queries = make_queries(chunks, args.queries, args.seed)
+        if not queries:
+            parser.error("the corpus has no chunks with usable sentences")
+        print(f"chunks={len(chunks)} queries={len(queries)} ingest={time.perf_counter() - started:.1f}s "
+              f"k={settings.RETRIEVAL_K} hybrid={lexical is not None}")
+
+        reranker = CrossEncoderReranker(
+            args.rerank_model,
+            top_n=args.top_n,
+            batch_size=settings.RETRIEVAL_RERANK_BATCH_SIZE,
+            min_score=settings.RETRIEVAL_RERANK_MIN_SCORE,
+        )
+        modes = {
+            f"dense/{settings.RETRIEVAL_K}": build_search(vectorstore, model, packer, lexical, None, args.candidates),
+            f"rerank/{args.candidates}->{args.top_n}": build_search(
+                vectorstore, model, packer, lexical, reranker, args.candidates
+            ),
+        }
+        totals = {name: {"hits": 0, "tokens": 0, "seconds": 0.0} for name in modes}
+        for query, source in queries:
+            for name, search in modes.items():
+                started = time.perf_counter()
+                context = search.search(query)
+                totals[name]["seconds"] += time.perf_counter() - started
+                totals[name]["hits"] += int(reached_context(source, context))
+                totals[name]["tokens"] += sum(packer.token_counter(document.page_content) for document in context)
+        if lexical is not None:
+            lexical.close()
+
+    n = len(queries)
+    baseline_tokens = max(1e-9, next(iter(totals.values()))["tokens"] / n)
+    print(f"{'mode':>16} {'hit rate':>9} {'tokens':>8} {'saved':>7} {'retrieve ms':>12} {'prompt eval s':>14}")
+    for name, total in totals.items():
+        tokens = total["tokens"] / n
+        print(
+            f"{name:>16} {total['hits'] / n:>9.3f} {tokens:>8.0f} "
+            f"{(1 - tokens / baseline_tokens) * 100:>6.1f}% {total['seconds'] / n * 1000:>12.1f} "
+            f"{tokens / args.prompt_tps:>14.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
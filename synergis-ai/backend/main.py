@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
@@ -7,18 +8,25 @@ from app.core.logging import setup_logging
 from app.core.error_handlers import setup_error_handlers
 from app.core.rate_limiter import RateLimiter
 from app.core.docs import custom_openapi
-from app.db.session import init_db, close_db_connection
-from app.api import auth, consultation
+from app.core.metrics import render_metrics
+from app.core.redis import close_redis
+from app.db.session import init_db, close_db_connection, close_async_db_connection
+from app.api import auth, consultation, jobs
+from app.services.registry import services
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Setup
     setup_logging()
     init_db()
+    await services.startup()
     
     yield
     
     # Cleanup
+    await services.shutdown()
+    await close_redis()
+    await close_async_db_connection()
     close_db_connection()
 
 app = FastAPI(
@@ -47,10 +55,18 @@ app.add_middleware(
     RateLimiter,
     requests_limit=settings.RATE_LIMIT_REQUESTS,
     window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+    user_requests_limit=settings.RATE_LIMIT_USER_REQUESTS,
+    route_limits={
+        f"{settings.API_V1_STR}{path}": limit
+        for path, limit in settings.RATE_LIMIT_ROUTES.items()
+    },
+    backend=settings.RATE_LIMIT_BACKEND,
     exclude_paths=[
         f"{settings.API_V1_STR}/docs",
         f"{settings.API_V1_STR}/redoc",
         f"{settings.API_V1_STR}/openapi.json",
+        "/health",
+        "/metrics",
     ]
 )
 
@@ -70,6 +86,12 @@ app.include_router(
     tags=["consultation"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix=f"{settings.API_V1_STR}/jobs",
+    tags=["jobs"]
+)
+
 @app.get("/")
 async def root():
     return {
@@ -78,6 +100,17 @@ async def root():
         "docs": f"{settings.API_V1_STR}/docs"
     }
 
+@app.get("/health")
+async def health(response: Response):
+    if not services.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return render_metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
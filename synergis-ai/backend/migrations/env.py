@@ -5,6 +5,8 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models.base import Base
+# Import the models so their tables are registered on Base.metadata
+from app.models import consultation_history, feedback, interaction, job  # noqa: F401
 from app.core.config import settings
 
 config = context.config
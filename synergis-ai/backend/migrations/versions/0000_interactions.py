@@ -0,0 +1,41 @@
+"""interactions
+
+Revision ID: 0000_interactions
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0000_interactions"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "interactions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("item_id", sa.String(), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("weight", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_interactions_id", "interactions", ["id"])
+    op.create_index("ix_interactions_user_id", "interactions", ["user_id"])
+    op.create_index("ix_interactions_item_id", "interactions", ["item_id"])
+    op.create_index("ix_interactions_created_at", "interactions", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_interactions_created_at", table_name="interactions")
+    op.drop_index("ix_interactions_item_id", table_name="interactions")
+    op.drop_index("ix_interactions_user_id", table_name="interactions")
+    op.drop_index("ix_interactions_id", table_name="interactions")
+    op.drop_table("interactions")
@@ -0,0 +1,53 @@
+"""consultation history
+
+Revision ID: 0001_consultation_history
+Revises: 0000_interactions
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_consultation_history"
+down_revision = "0000_interactions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "consultation_sessions",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_consultation_sessions_updated_at", "consultation_sessions", ["updated_at"]
+    )
+    op.create_table(
+        "consultation_messages",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+        sa.Column("session_id", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["session_id"], ["consultation_sessions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_consultation_messages_session_id_id",
+        "consultation_messages",
+        ["session_id", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_consultation_messages_session_id_id", table_name="consultation_messages")
+    op.drop_table("consultation_messages")
+    op.drop_index("ix_consultation_sessions_updated_at", table_name="consultation_sessions")
+    op.drop_table("consultation_sessions")
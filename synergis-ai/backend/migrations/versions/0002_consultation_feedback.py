@@ -0,0 +1,38 @@
+"""consultation feedback
+
+Revision ID: 0002_consultation_feedback
+Revises: 0001_consultation_history
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_consultation_feedback"
+down_revision = "0001_consultation_history"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "consultation_feedback",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.String(), nullable=False),
+        sa.Column("rating", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_consultation_feedback_id", "consultation_feedback", ["id"])
+    op.create_index("ix_consultation_feedback_session_id", "consultation_feedback", ["session_id"])
+    op.create_index("ix_consultation_feedback_created_at", "consultation_feedback", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_consultation_feedback_created_at", table_name="consultation_feedback")
+    op.drop_index("ix_consultation_feedback_session_id", table_name="consultation_feedback")
+    op.drop_index("ix_consultation_feedback_id", table_name="consultation_feedback")
+    op.drop_table("consultation_feedback")
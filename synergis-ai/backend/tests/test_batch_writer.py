@@ -0,0 +1,47 @@
+import asyncio
+from typing import List
+
+from app.db.batch_writer import BatchWriter
+from app.schemas.feedback import FeedbackCreate
+
+def _feedback(count: int) -> List[FeedbackCreate]:
+    return [FeedbackCreate(session_id=f"session-{i}", rating=5) for i in range(count)]
+
+def test_stop_writes_partially_collected_batch():
+    written: List[FeedbackCreate] = []
+
+    async def write(batch: List[FeedbackCreate]) -> None:
+        written.extend(batch)
+
+    async def scenario() -> BatchWriter[FeedbackCreate]:
+        writer = BatchWriter("feedback", write, batch_size=100, flush_seconds=10.0)
+        writer.start()
+        records = _feedback(5)
+        assert all(writer.submit(record) for record in records)
+        # The background task now holds the records, waiting to fill its batch
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        assert written == records
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.stats() == {"queued": 0, "written": 5, "batches": 1, "failed": 0, "dropped": 0}
+
+def test_stop_writes_records_submitted_during_a_write():
+    written: List[FeedbackCreate] = []
+
+    async def write(batch: List[FeedbackCreate]) -> None:
+        await asyncio.sleep(0.05)
+        written.extend(batch)
+
+    async def scenario() -> None:
+        writer = BatchWriter("feedback", write, batch_size=2, flush_seconds=0.01)
+        writer.start()
+        records = _feedback(7)
+        for record in records:
+            writer.submit(record)
+        await asyncio.sleep(0.01)
+        await writer.stop()
+        assert written == records
+
+    asyncio.run(scenario())